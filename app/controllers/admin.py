@@ -18,7 +18,9 @@ class WorkoutAdmin(ModelView, model=Workout):
     column_list = [Workout.id, Workout.title, Workout.coach_id, Workout.datetime, Workout.sport_type]
     column_searchable_list = [Workout.title]
     column_sortable_list = [Workout.id, Workout.datetime, Workout.sport_type]
-    form_columns = [Workout.title, Workout.description, Workout.coach_id, Workout.datetime, Workout.address, Workout.price, Workout.sport_type]
+    form_columns = [Workout.title, Workout.description, Workout.coach_id, Workout.datetime, Workout.address, Workout.price, Workout.sport_type, Workout.capacity]
+    column_details_exclude_list = [Workout.search_vector]
+    column_export_exclude_list = [Workout.search_vector]
     can_create = True
     can_edit = True
     can_delete = True
@@ -28,7 +30,9 @@ class CourseAdmin(ModelView, model=Course):
     column_list = [Course.id, Course.title, Course.coach_id, Course.price]
     column_searchable_list = [Course.title]
     column_sortable_list = [Course.id, Course.price]
-    form_columns = [Course.title, Course.description, Course.coach_id, Course.price]
+    form_columns = [Course.title, Course.description, Course.coach_id, Course.price, Course.capacity]
+    column_details_exclude_list = [Course.search_vector]
+    column_export_exclude_list = [Course.search_vector]
     can_create = True
     can_edit = True
     can_delete = True
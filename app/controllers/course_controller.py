@@ -1,83 +1,225 @@
+from datetime import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
-from sqlalchemy.orm import joinedload
-from app.models.course import Course
-from app.models.workout import Workout
+from sqlalchemy import select, or_, func, delete, exists, literal, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import joinedload, selectinload
+from app.models.course import Course, course_workouts, course_enrollments, course_waitlist
+from app.models.workout import Workout, workout_enrollments
 from app.models.user import User
-from app.schemas.course_schemas import CourseCreate, CourseListWithCoach, CourseListWithEnrolledUsers, CourseResponse, CourseList
-from fastapi import HTTPException, status, APIRouter, Depends
+from app.schemas.course_schemas import CourseCreate, CourseListWithCoach, CourseListWithEnrolledUsers, CourseResponse, CourseList, CourseWithCoach, CourseWorkoutIds
+from typing import Iterable, List, Optional, Tuple
+from fastapi import HTTPException, status, APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from app.core.database import get_db
-from app.core.auth import get_current_user, get_current_coach
+from app.core.search import MIN_SEARCH_LENGTH, text_match, websearch_query
+from app.core.seats import SeatAllocator, EnrollmentStatus
+from app.core.response_cache import response_cache, WORKOUTS, COURSES, coach_tag
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.serialization import ResponseShape, json_response, shape_params
+from app.core.export import EXPORT_FORMAT_PATTERN, export_response
+from app.core.auth import get_current_user, get_current_coach, require_export_access
+from app.controllers.workout_controller import workout_seats
 
 router = APIRouter(prefix="/courses", tags=["courses"])
 my_router = APIRouter(prefix="/my/courses", tags=["my-courses"])
 
+course_seats = SeatAllocator(Course.__table__, course_enrollments, course_waitlist, "course_id")
+
+def _upcoming_course_workouts(course_id: int):
+    """Запрос id предстоящих тренировок курса"""
+    return (
+        select(course_workouts.c.workout_id)
+        .join(Workout, Workout.id == course_workouts.c.workout_id)
+        .where(
+            course_workouts.c.course_id == course_id,
+            Workout.datetime >= datetime.utcnow()
+        )
+    )
+
+def _course_load_options(shape: Optional[ResponseShape] = None) -> list:
+    """Опции загрузки курса: коллекция тренировок подгружается отдельным
+    IN-запросом, без декартова произведения строк. Участники не загружаются:
+    их количество хранится в Course.enrolled_count. С shape загружаются
+    только запрошенные колонки и раскрытые связи"""
+    if shape is None:
+        return [
+            joinedload(Course.coach),
+            selectinload(Course.workouts).joinedload(Workout.coach),
+        ]
+    options = shape.load_only(Course, "id", "coach_id")
+    if shape.expands("coach"):
+        options.append(shape.loader(Course.coach))
+    if shape.expands("workouts"):
+        workouts = selectinload(Course.workouts)
+        if shape.expands("workouts.coach"):
+            workouts = workouts.selectinload(Workout.coach) if shape.normalized else workouts.joinedload(Workout.coach)
+        options.append(workouts)
+    return options
+
 class CourseController:
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    async def _check_workouts(self, workout_ids: List[int], coach_id: int) -> None:
+        """Проверка одним запросом, что все тренировки существуют и принадлежат тренеру"""
+        found = await self.session.scalar(
+            select(func.count()).select_from(Workout).where(
+                Workout.id.in_(workout_ids),
+                Workout.coach_id == coach_id
+            )
+        )
+        if found != len(workout_ids):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некоторые тренировки не найдены или не принадлежат вам"
+            )
+
+    async def _lock_course(self, course_id: int, coach_id: int) -> None:
+        """Проверка владельца и блокировка строки курса. Состав курса хранится
+        в таблице связи, поэтому версия курса (updated_at) обновляется здесь же"""
+        locked = await self.session.scalar(
+            update(Course)
+            .where(Course.id == course_id, Course.coach_id == coach_id)
+            .values(updated_at=func.now())
+            .returning(Course.id)
+        )
+        if locked is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Курс не найден или у вас нет прав на его изменение"
+            )
+
+    async def _attach(self, course_id: int, workout_ids: List[int]) -> None:
+        """Связи курса с тренировками одним INSERT ... SELECT; уже существующие пропускаются"""
+        await self.session.execute(
+            pg_insert(course_workouts)
+            .from_select(
+                ["course_id", "workout_id"],
+                select(literal(course_id), Workout.id).where(Workout.id.in_(workout_ids))
+            )
+            .on_conflict_do_nothing()
+        )
+
+    async def _sync_course_part(self, workout_ids: Iterable[int]) -> None:
+        """Пересчёт is_course_part одним UPDATE. Строки, у которых флаг не
+        изменился, не трогаются, чтобы не сбивать их версии (ETag)"""
+        in_course = exists().where(course_workouts.c.workout_id == Workout.id)
+        await self.session.execute(
+            update(Workout)
+            .where(
+                Workout.id.in_(list(workout_ids)),
+                Workout.is_course_part.is_distinct_from(in_course)
+            )
+            .values(is_course_part=in_course)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _load_course(self, course_id: int) -> Course:
+        result = await self.session.execute(
+            select(Course)
+            .options(*_course_load_options())
+            .where(Course.id == course_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().one()
+
     async def create_course(self, course_data: CourseCreate, coach_id: int) -> Course:
         """Создание нового курса"""
+        workout_ids = sorted(set(course_data.workout_ids))
         async with self.session.begin():
-            result = await self.session.execute(
-                select(Workout).where(
-                    Workout.id.in_(course_data.workout_ids),
-                    Workout.coach_id == coach_id
-                )
-            )
-            workouts = result.scalars().all()
-            
-            if len(workouts) != len(course_data.workout_ids):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Некоторые тренировки не найдены или не принадлежат вам"
-                )
-            
-            for workout in workouts:
-                workout.is_course_part = True
-            
+            await self._check_workouts(workout_ids, coach_id)
+
             new_course = Course(
                 title=course_data.title,
                 description=course_data.description,
                 price=course_data.price,
-                coach_id=coach_id,
-                workouts=workouts
+                capacity=course_data.capacity,
+                coach_id=coach_id
             )
-            
             self.session.add(new_course)
             await self.session.flush()
-            await self.session.refresh(new_course)
-            await self.session.refresh(new_course, ['workouts'])
-            
-            return new_course
 
-    async def get_all_courses(self, search: str = None) -> CourseListWithCoach:
+            await self._attach(new_course.id, workout_ids)
+            await self._sync_course_part(workout_ids)
+            course = await self._load_course(new_course.id)
+        # У тренировок курса изменился is_course_part
+        await response_cache.invalidate(COURSES, WORKOUTS, coach_tag(coach_id))
+        return course
+
+    async def add_workouts_to_course(self, course_id: int, workout_ids: List[int], coach_id: int) -> Course:
+        """Добавление в курс сразу многих тренировок в одной транзакции"""
+        workout_ids = sorted(set(workout_ids))
+        async with self.session.begin():
+            await self._lock_course(course_id, coach_id)
+            await self._check_workouts(workout_ids, coach_id)
+            await self._attach(course_id, workout_ids)
+            await self._sync_course_part(workout_ids)
+            course = await self._load_course(course_id)
+        await response_cache.invalidate(COURSES, WORKOUTS, coach_tag(coach_id))
+        return course
+
+    async def remove_workouts_from_course(self, course_id: int, workout_ids: List[int], coach_id: int) -> Course:
+        """Удаление из курса сразу многих тренировок: один DELETE по таблице
+        связи и один пересчёт is_course_part. Тренировки не из курса пропускаются"""
+        async with self.session.begin():
+            await self._lock_course(course_id, coach_id)
+            result = await self.session.execute(
+                delete(course_workouts)
+                .where(
+                    course_workouts.c.course_id == course_id,
+                    course_workouts.c.workout_id.in_(set(workout_ids))
+                )
+                .returning(course_workouts.c.workout_id)
+            )
+            await self._sync_course_part(result.scalars().all())
+            course = await self._load_course(course_id)
+        await response_cache.invalidate(COURSES, WORKOUTS, coach_tag(coach_id))
+        return course
+
+    async def get_all_courses(self, search: str = None, shape: Optional[ResponseShape] = None) -> CourseListWithCoach:
         """Получение списка всех курсов"""
         async with self.session.begin():
             query = (
                 select(Course)
-                .options(joinedload(Course.coach), joinedload(Course.workouts))
+                .options(*_course_load_options(shape))
             )
             
             if search:
-                search_term = f"%{search}%"
-                query = query.join(Course.workouts).where(
-                    or_(
-                        Course.title.ilike(search_term),
-                        Workout.sport_type.ilike(search_term)
+                condition, rank = text_match(Course.search_vector, Course.title, search)
+                # Курс также находится по тренировкам (вид спорта, названия) через EXISTS,
+                # без join, который размножал строки
+                workout_match = (
+                    select(course_workouts.c.course_id)
+                    .join(Workout, Workout.id == course_workouts.c.workout_id)
+                    .where(
+                        course_workouts.c.course_id == Course.id,
+                        Workout.search_vector.op("@@")(websearch_query(search))
                     )
+                    .exists()
                 )
-            
+                query = query.where(or_(condition, workout_match)).order_by(rank.desc(), Course.id)
+            else:
+                query = query.order_by(Course.id)
+
             result = await self.session.execute(query)
-            courses = result.unique().scalars().all()
-            return CourseListWithCoach(courses=courses)
+            courses = result.scalars().all()
+            # Без валидации: ответ сериализуется по схеме роута (app.core.serialization)
+            return CourseListWithCoach.model_construct(courses=courses)
+
+    @staticmethod
+    def export_courses(export_format: str, coach_id: Optional[int] = None) -> StreamingResponse:
+        """Потоковая выгрузка курсов (NDJSON или CSV) в порядке id"""
+        query = select(Course).options(*_course_load_options()).order_by(Course.id)
+        if coach_id is not None:
+            query = query.where(Course.coach_id == coach_id)
+        return export_response(query, CourseWithCoach, export_format, "courses")
 
-    async def get_course(self, course_id: int) -> Course:
+    async def get_course(self, course_id: int, shape: Optional[ResponseShape] = None) -> Course:
         """Получение информации о курсе"""
         async with self.session.begin():
             result = await self.session.execute(
                 select(Course)
-                .options(joinedload(Course.coach), joinedload(Course.workouts))
+                .options(*_course_load_options(shape))
                 .where(Course.id == course_id)
             )
             course = result.scalars().first()
@@ -104,49 +246,48 @@ class CourseController:
                     detail="Курс не найден или у вас нет прав на его удаление"
                 )
 
+            result = await self.session.execute(
+                delete(course_workouts)
+                .where(course_workouts.c.course_id == course_id)
+                .returning(course_workouts.c.workout_id)
+            )
+            workout_ids = result.scalars().all()
             await self.session.delete(course)
+            await self.session.flush()
+            await self._sync_course_part(workout_ids)
+        await response_cache.invalidate(COURSES, WORKOUTS, coach_tag(coach_id))
 
     async def remove_workout_from_course(self, course_id: int, workout_id: int, coach_id: int) -> None:
         """Удаление тренировки из курса"""
         async with self.session.begin():
+            await self._lock_course(course_id, coach_id)
             result = await self.session.execute(
-                select(Course).where(
-                    Course.id == course_id,
-                    Course.coach_id == coach_id
-                )
-            )
-            course = result.scalars().first()
-            if not course:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Курс не найден или у вас нет прав на его изменение"
-                )
-
-            result = await self.session.execute(
-                select(Workout).where(
-                    Workout.id == workout_id,
-                    Workout.coach_id == coach_id
+                delete(course_workouts)
+                .where(
+                    course_workouts.c.course_id == course_id,
+                    course_workouts.c.workout_id == workout_id,
+                    course_workouts.c.workout_id.in_(
+                        select(Workout.id).where(Workout.coach_id == coach_id)
+                    )
                 )
+                .returning(course_workouts.c.workout_id)
             )
-            workout = result.scalars().first()
-            if not workout:
+            if result.scalar() is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Тренировка не найдена или не принадлежит вам"
                 )
-            
-            course.workouts.remove(workout)
-            
-            result = await self.session.execute(
-                select(Course).join(Course.workouts).where(Workout.id == workout_id)
-            )
-            remaining_courses = result.scalars().all()
-            
-            if not remaining_courses:
-                workout.is_course_part = False
+            await self._sync_course_part([workout_id])
+        await response_cache.invalidate(COURSES, WORKOUTS, coach_tag(coach_id))
 
-    async def enroll_to_course(self, course_id: int, user: User) -> Course:
-        """Запись на курс"""
+    async def enroll_to_course(
+        self, course_id: int, user: User, include_workouts: bool = False
+    ) -> Tuple[Optional[int], List[int]]:
+        """Запись на курс. Если мест нет, пользователь встаёт в лист ожидания;
+        возвращается позиция в нём (None - записан сразу). С include_workouts
+        пользователь в той же транзакции записывается на все предстоящие
+        тренировки курса; возвращаются их id"""
+        workout_ids = []
         async with self.session.begin():
             if user.is_coach:
                 raise HTTPException(
@@ -154,36 +295,48 @@ class CourseController:
                     detail="Тренеры не могут записываться на курсы"
                 )
 
-            result = await self.session.execute(
-                select(User)
-                .options(joinedload(User.enrolled_courses))
-                .where(User.id == user.id)
-            )
-            user = result.scalars().first()
-
-            result = await self.session.execute(
-                select(Course).where(Course.id == course_id)
-            )
-            course = result.scalars().first()
-            if not course:
+            result, position = await course_seats.enroll(self.session, course_id, user.id)
+            if result == EnrollmentStatus.NOT_FOUND:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Курс не найден"
                 )
-
-            if course in user.enrolled_courses:
+            if result == EnrollmentStatus.ALREADY_ENROLLED:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Вы уже записаны на этот курс"
                 )
+            if result == EnrollmentStatus.ALREADY_WAITLISTED:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Вы уже в листе ожидания этого курса"
+                )
+            if include_workouts and position is None:
+                workout_ids, full = await workout_seats.enroll_many(
+                    self.session, _upcoming_course_workouts(course_id), user.id,
+                    {"source_course_id": course_id}
+                )
+                if full:
+                    # Исключение откатывает транзакцию целиком, включая запись на курс
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="На часть тренировок курса нет мест"
+                    )
+            coach_id = await self.session.scalar(select(Course.coach_id).where(Course.id == course_id))
+        if position is None:
+            # Изменился enrolled_count в публичных ответах (и у тренировок курса)
+            tags = [COURSES, coach_tag(coach_id)] + ([WORKOUTS] if workout_ids else [])
+            await response_cache.invalidate(*tags)
+        return position, workout_ids
 
-            user.enrolled_courses.append(course)
-            await self.session.flush()
-            await self.session.refresh(course)
-            return course
-
-    async def unenroll_from_course(self, course_id: int, user: User) -> None:
-        """Отмена записи на курс"""
+    async def unenroll_from_course(
+        self, course_id: int, user: User, include_workouts: bool = False
+    ) -> Tuple[EnrollmentStatus, List[int]]:
+        """Отмена записи на курс или выход из листа ожидания. С include_workouts
+        пользователь отписывается от предстоящих тренировок курса, на которые
+        был записан вместе с курсом; записи, сделанные напрямую, остаются.
+        Возвращаются id тренировок, от которых отписан"""
+        workout_ids = []
         async with self.session.begin():
             if user.is_coach:
                 raise HTTPException(
@@ -191,30 +344,27 @@ class CourseController:
                     detail="Тренеры не могут отписываться от курсов"
                 )
 
-            result = await self.session.execute(
-                select(User)
-                .options(joinedload(User.enrolled_courses))
-                .where(User.id == user.id)
-            )
-            user = result.scalars().first()
-
-            result = await self.session.execute(
-                select(Course).where(Course.id == course_id)
-            )
-            course = result.scalars().first()
-            if not course:
+            result = await course_seats.unenroll(self.session, course_id, user.id)
+            if result == EnrollmentStatus.NOT_FOUND:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Курс не найден"
                 )
-
-            if course not in user.enrolled_courses:
+            if result == EnrollmentStatus.NOT_ENROLLED:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Вы не записаны на этот курс"
                 )
-
-            user.enrolled_courses.remove(course)
+            if include_workouts and result == EnrollmentStatus.UNENROLLED:
+                workout_ids = await workout_seats.unenroll_many(
+                    self.session, _upcoming_course_workouts(course_id), user.id,
+                    workout_enrollments.c.source_course_id == course_id
+                )
+            coach_id = await self.session.scalar(select(Course.coach_id).where(Course.id == course_id))
+        if result == EnrollmentStatus.UNENROLLED:
+            tags = [COURSES, coach_tag(coach_id)] + ([WORKOUTS] if workout_ids else [])
+            await response_cache.invalidate(*tags)
+        return result, workout_ids
 
     async def get_my_courses(self, user: User) -> CourseListWithEnrolledUsers:
         """Получение списка курсов пользователя"""
@@ -222,38 +372,54 @@ class CourseController:
             if user.is_coach:
                 query = (
                     select(Course)
-                    .options(
-                        joinedload(Course.coach),
-                        joinedload(Course.workouts),
-                        joinedload(Course.enrolled_users)
-                    )
+                    .options(*_course_load_options())
                     .where(Course.coach_id == user.id)
                 )
             else:
                 query = (
                     select(Course)
-                    .options(
-                        joinedload(Course.coach),
-                        joinedload(Course.workouts)
-                    )
+                    .options(*_course_load_options())
                     .join(Course.enrolled_users)
                     .where(User.id == user.id)
                 )
 
             result = await self.session.execute(query)
-            courses = result.unique().scalars().all()
-            return CourseListWithEnrolledUsers(courses=courses)
+            courses = result.scalars().all()
+            return CourseListWithEnrolledUsers.model_construct(courses=courses)
+
+    async def get_my_courses_etag(self, user: User) -> str:
+        """ETag списка курсов пользователя: версии курсов, их тренеров и тренировок"""
+        async with self.session.begin():
+            query = (
+                select(
+                    Course.id,
+                    Course.updated_at,
+                    User.updated_at,
+                    func.max(Workout.updated_at),
+                    func.count(Workout.id),
+                )
+                .join(User, User.id == Course.coach_id)
+                .outerjoin(course_workouts, course_workouts.c.course_id == Course.id)
+                .outerjoin(Workout, Workout.id == course_workouts.c.workout_id)
+                .group_by(Course.id, User.updated_at)
+                .order_by(Course.id)
+            )
+            if user.is_coach:
+                query = query.where(Course.coach_id == user.id)
+            else:
+                query = query.join(
+                    course_enrollments, course_enrollments.c.course_id == Course.id
+                ).where(course_enrollments.c.user_id == user.id)
+
+            result = await self.session.execute(query)
+            return make_etag(result.all())
 
     async def get_my_course(self, course_id: int, user: User) -> Course:
         """Получение информации о курсе пользователя"""
         if user.is_coach:
             query = (
                 select(Course)
-                .options(
-                    joinedload(Course.coach),
-                    joinedload(Course.workouts),
-                    joinedload(Course.enrolled_users)
-                )
+                .options(*_course_load_options())
                 .where(
                     Course.id == course_id,
                     Course.coach_id == user.id
@@ -262,10 +428,7 @@ class CourseController:
         else:
             query = (
                 select(Course)
-                .options(
-                    joinedload(Course.coach),
-                    joinedload(Course.workouts)
-                )
+                .options(*_course_load_options())
                 .join(Course.enrolled_users)
                 .where(
                     Course.id == course_id,
@@ -289,36 +452,59 @@ async def create_course(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_coach)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        return await controller.create_course(course_data, current_user.id)
+    controller = CourseController(db)
+    return await controller.create_course(course_data, current_user.id)
 
 @router.get("/", response_model=CourseList)
 async def get_all_courses(
+    request: Request,
+    search: Optional[str] = Query(None, min_length=MIN_SEARCH_LENGTH),
+    shape: Optional[ResponseShape] = Depends(shape_params(CourseWithCoach)),
     db: AsyncSession = Depends(get_db)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        return await controller.get_all_courses()
+    """Список курсов. fields / expand / format задают набор полей и вложенных объектов"""
+    controller = CourseController(db)
+    return await response_cache.respond(
+        request, COURSES, CourseList, lambda: controller.get_all_courses(search, shape), shape
+    )
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(require_export_access)])
+async def export_courses(
+    export_format: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    coach_id: Optional[int] = None
+):
+    """Выгрузка всех курсов потоком: NDJSON (с тренировками) или CSV (простые поля).
+    Только для администраторов и партнёров (X-API-Key)"""
+    return CourseController.export_courses(export_format, coach_id)
 
 @router.get("/{course_id}", response_model=CourseResponse)
 async def get_course(
     course_id: int,
+    shape: Optional[ResponseShape] = Depends(shape_params(CourseResponse)),
     db: AsyncSession = Depends(get_db)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        return await controller.get_course(course_id)
+    controller = CourseController(db)
+    course = await controller.get_course(course_id, shape)
+    if shape is not None:
+        return json_response(CourseResponse, course, shape=shape)
+    return course
 
 # Роуты для личных курсов
 @my_router.get("/", response_model=CourseListWithEnrolledUsers)
 async def get_my_courses(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        return await controller.get_my_courses(current_user)
+    """Курсы пользователя. Поддерживает If-None-Match: если список
+    не изменился, возвращается 304 без загрузки и сериализации"""
+    controller = CourseController(db)
+    etag = await controller.get_my_courses_etag(current_user)
+    if etag_matches(request, etag):
+        return not_modified(etag, private=True)
+    response = json_response(CourseListWithEnrolledUsers, await controller.get_my_courses(current_user))
+    set_etag(response, etag, private=True)
+    return response
 
 @my_router.get("/{course_id}", response_model=CourseResponse)
 async def get_my_course(
@@ -326,28 +512,61 @@ async def get_my_course(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        return await controller.get_my_course(course_id, current_user)
+    controller = CourseController(db)
+    return await controller.get_my_course(course_id, current_user)
+
+@router.post("/{course_id}/workouts", response_model=CourseResponse)
+async def add_workouts_to_course(
+    course_id: int,
+    data: CourseWorkoutIds,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_coach)
+):
+    """Добавление в курс нескольких тренировок одним запросом"""
+    controller = CourseController(db)
+    return await controller.add_workouts_to_course(course_id, data.workout_ids, current_user.id)
+
+@router.delete("/{course_id}/workouts", response_model=CourseResponse)
+async def remove_workouts_from_course(
+    course_id: int,
+    workout_ids: List[int] = Query(..., alias="workout_id", min_length=1),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_coach)
+):
+    """Удаление из курса нескольких тренировок: ?workout_id=1&workout_id=2"""
+    controller = CourseController(db)
+    return await controller.remove_workouts_from_course(course_id, workout_ids, current_user.id)
 
 @router.post("/{course_id}/enroll")
 async def enroll_to_course(
     course_id: int,
+    include_workouts: bool = Query(False, description="Записать и на все предстоящие тренировки курса"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        await controller.enroll_to_course(course_id, current_user)
-        return {"message": "Successfully enrolled to course"}
+    controller = CourseController(db)
+    position, workout_ids = await controller.enroll_to_course(course_id, current_user, include_workouts)
+    if position is not None:
+        return {"message": "Added to course waitlist", "waitlist_position": position}
+    if include_workouts:
+        return {"message": "Successfully enrolled to course", "workout_ids": workout_ids}
+    return {"message": "Successfully enrolled to course"}
 
 @router.post("/{course_id}/unenroll")
 async def unenroll_from_course(
     course_id: int,
+    include_workouts: bool = Query(
+        False,
+        description="Отписать и от предстоящих тренировок курса, на которые пользователь был записан "
+                    "вместе с курсом (enroll с include_workouts). Записи на тренировки напрямую остаются"
+    ),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
-    async with db as session:
-        controller = CourseController(session)
-        await controller.unenroll_from_course(course_id, current_user)
-        return {"message": "Successfully unenrolled from course"}
\ No newline at end of file
+    controller = CourseController(db)
+    result, workout_ids = await controller.unenroll_from_course(course_id, current_user, include_workouts)
+    if result == EnrollmentStatus.LEFT_WAITLIST:
+        return {"message": "Removed from course waitlist"}
+    if include_workouts:
+        return {"message": "Successfully unenrolled from course", "workout_ids": workout_ids}
+    return {"message": "Successfully unenrolled from course"}
\ No newline at end of file
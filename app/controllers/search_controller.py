@@ -0,0 +1,53 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, or_, func, union_all
+from app.models.workout import Workout
+from app.models.course import Course
+from app.schemas.search_schemas import SuggestionList
+from fastapi import APIRouter, Depends, Query
+from app.core.database import get_db
+from app.core.search import MIN_SEARCH_LENGTH, SUGGEST_LIMIT, prefix_query
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+class SearchController:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def suggest(self, prefix: str, limit: int = SUGGEST_LIMIT) -> SuggestionList:
+        """Автодополнение по началу названий тренировок, курсов и видов спорта"""
+        tsquery = prefix_query(prefix)
+        if tsquery is None:
+            return SuggestionList(suggestions=[])
+
+        candidates = union_all(
+            select(Workout.title.label("text"), func.similarity(Workout.title, prefix).label("score"))
+            .where(or_(
+                Workout.title.istartswith(prefix, autoescape=True),
+                Workout.search_vector.op("@@")(tsquery)
+            )),
+            select(Course.title.label("text"), func.similarity(Course.title, prefix).label("score"))
+            .where(or_(
+                Course.title.istartswith(prefix, autoescape=True),
+                Course.search_vector.op("@@")(tsquery)
+            )),
+            select(Workout.sport_type.label("text"), func.similarity(Workout.sport_type, prefix).label("score"))
+            .where(Workout.sport_type.istartswith(prefix, autoescape=True)),
+        ).subquery()
+
+        result = await self.session.execute(
+            select(candidates.c.text)
+            .group_by(candidates.c.text)
+            .order_by(func.max(candidates.c.score).desc(), candidates.c.text)
+            .limit(limit)
+        )
+        return SuggestionList(suggestions=result.scalars().all())
+
+@router.get("/suggest", response_model=SuggestionList)
+async def suggest(
+    q: str = Query(..., min_length=MIN_SEARCH_LENGTH),
+    limit: int = Query(SUGGEST_LIMIT, ge=1, le=50),
+    db: AsyncSession = Depends(get_db)
+):
+    """Подсказки для строки поиска"""
+    controller = SearchController(db)
+    return await controller.suggest(q, limit)
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from app.core.storage import LOCAL_UPLOAD_URL, UPLOAD_MAX_BYTES, LocalStorage, get_storage, too_large_error
+
+# Приёмник прямых загрузок для локального драйвера хранилища (аналог presigned URL в S3)
+router = APIRouter(prefix=LOCAL_UPLOAD_URL, tags=["storage"])
+
+@router.put("/{key:path}", status_code=status.HTTP_204_NO_CONTENT)
+async def upload_local_object(
+    key: str,
+    expires: int,
+    signature: str,
+    request: Request
+):
+    """Загрузка файла по подписанной ссылке"""
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND)
+
+    content_type = request.headers.get("content-type", "")
+    if not storage.verify(key, content_type, expires, signature):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Ссылка недействительна или истекла"
+        )
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES:
+        raise too_large_error()
+
+    await storage.write_stream(key, request.stream(), UPLOAD_MAX_BYTES)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,14 +1,26 @@
+from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, true
 from app.models.user import User
 from app.models.course import Course
-from app.schemas.user_schemas import UserCreate, CoachList, TokenRequest, UserResponse, CoachResponse
+from app.models.workout import Workout
+from app.schemas.user_schemas import (
+    UserCreate, CoachList, TokenRequest, UserResponse, CoachResponse, CoachStats,
+    PhotoUploadRequest, PhotoUploadTicket, PhotoUploadConfirm
+)
 from app.core.auth import get_password_hash, create_access_token, verify_password
-from fastapi import HTTPException, status, APIRouter, Depends
-from sqlalchemy.orm import joinedload
-from datetime import timedelta
+from fastapi import HTTPException, status, APIRouter, Depends, UploadFile, File, Request
+from sqlalchemy.orm import selectinload
+from datetime import datetime, timedelta
 from app.core.database import get_db
 from app.core.auth import get_current_user
+from app.core.photos import store_profile_photo, upload_profile_photo
+from app.core.response_cache import response_cache, WORKOUTS, COURSES, COACHES, coach_tag
+from app.core.serialization import ResponseShape, shape_params
+from app.core.storage import (
+    ALLOWED_IMAGE_TYPES, PRESIGNED_UPLOAD_EXPIRE_SECONDS, UPLOAD_MAX_BYTES, LimitedUploadRoute,
+    detect_image_type, get_storage, is_photo_upload_key, new_photo_key, too_large_error, unsupported_image_error
+)
 
 router = APIRouter(prefix="/users", tags=["users"])
 coach_router = APIRouter(prefix="/coaches", tags=["coaches"])
@@ -26,7 +38,7 @@ class UserController:
                 detail="Email уже зарегистрирован"
             )
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash(user_data.password)
         new_user = User(
             email=user_data.email,
             first_name=user_data.first_name,
@@ -50,7 +62,7 @@ class UserController:
                 detail="Email уже зарегистрирован"
             )
 
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash(user_data.password)
         new_coach = User(
             email=user_data.email,
             first_name=user_data.first_name,
@@ -63,12 +75,13 @@ class UserController:
         self.session.add(new_coach)
         await self.session.commit()
         await self.session.refresh(new_coach)
+        await response_cache.invalidate(COACHES)
         return new_coach
 
     async def login(self, token_request: TokenRequest) -> dict:
         """Аутентификация пользователя"""
         user = await self.get_user_by_email(token_request.email)
-        if not user or not verify_password(token_request.password, user.hashed_password):
+        if not user or not await verify_password(token_request.password, user.hashed_password):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Неверный email или пароль",
@@ -92,37 +105,168 @@ class UserController:
         )
         return result.scalars().first()
 
-    async def get_all_coaches(self) -> CoachList:
+    async def get_all_coaches(self, shape: Optional[ResponseShape] = None) -> CoachList:
         """Получение списка всех тренеров"""
         result = await self.session.execute(
-            select(User).where(User.is_coach == True)
+            select(User)
+            .options(*(shape.load_only(User, "id") if shape else []))
+            .where(User.is_coach == True)
         )
         coaches = result.scalars().all()
-        return CoachList(coaches=coaches)
+        # Без валидации: ответ сериализуется по схеме роута (app.core.serialization)
+        return CoachList.model_construct(coaches=coaches)
 
-    async def get_coach_with_workouts(self, coach_id: int) -> CoachResponse:
+    async def get_coach_with_workouts(self, coach_id: int, shape: Optional[ResponseShape] = None) -> CoachResponse:
         """Получение тренера с его тренировками и курсами"""
+        if shape is None:
+            options = [
+                selectinload(User.workouts),
+                selectinload(User.courses).selectinload(Course.workouts)
+            ]
+        else:
+            options = []
+            # Вложенные "coach" - это тот же тренер из identity map: если они
+            # раскрыты, нужны все его колонки
+            if not any(path.endswith("coach") for path in shape.expand):
+                options += shape.load_only(User, "id")
+            if shape.expands("workouts"):
+                options.append(selectinload(User.workouts))
+            if shape.expands("courses"):
+                courses = selectinload(User.courses)
+                if shape.expands("courses.workouts"):
+                    courses = courses.selectinload(Course.workouts)
+                options.append(courses)
         result = await self.session.execute(
             select(User)
-            .options(
-                joinedload(User.workouts),
-                joinedload(User.courses).joinedload(Course.workouts)
-            )
+            .options(*options)
             .where(User.id == coach_id, User.is_coach == True)
         )
-        coach = result.unique().scalars().first()
+        coach = result.scalars().first()
         if not coach:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Тренер не найден"
             )
-        
-        # Отладочная информация
-        print(f"Coach workouts: {coach.workouts}")
-        print(f"Coach courses: {coach.courses}")
-        
+
         return coach
 
+    async def get_coach_stats(self, coach_id: int) -> CoachStats:
+        """Статистика тренера одним агрегирующим запросом по счётчикам записей"""
+        limited_workout = Workout.capacity.isnot(None)
+        workouts = (
+            select(
+                func.count(Workout.id).label("total"),
+                func.count(Workout.id).filter(Workout.datetime >= datetime.utcnow()).label("upcoming"),
+                func.coalesce(func.sum(Workout.enrolled_count), 0).label("enrollments"),
+                func.sum(Workout.enrolled_count).filter(limited_workout).label("limited_enrollments"),
+                func.sum(Workout.capacity).filter(limited_workout).label("capacity"),
+                func.coalesce(func.sum(Workout.price * Workout.enrolled_count), 0).label("revenue"),
+            )
+            .where(Workout.coach_id == coach_id)
+            .subquery()
+        )
+        limited_course = Course.capacity.isnot(None)
+        courses = (
+            select(
+                func.count(Course.id).label("total"),
+                func.coalesce(func.sum(Course.enrolled_count), 0).label("enrollments"),
+                func.sum(Course.enrolled_count).filter(limited_course).label("limited_enrollments"),
+                func.sum(Course.capacity).filter(limited_course).label("capacity"),
+                func.coalesce(func.sum(Course.price * Course.enrolled_count), 0).label("revenue"),
+            )
+            .where(Course.coach_id == coach_id)
+            .subquery()
+        )
+        result = await self.session.execute(
+            select(User.id, *workouts.c, *courses.c)
+            .select_from(User)
+            .join(workouts, true())
+            .join(courses, true())
+            .where(User.id == coach_id, User.is_coach == True)
+        )
+        row = result.first()
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Тренер не найден"
+            )
+        (_, workouts_total, upcoming, workout_enrollments, workout_limited, workout_capacity, workout_revenue,
+         courses_total, course_enrollments, course_limited, course_capacity, course_revenue) = row
+
+        def fill_rate(enrolled, capacity):
+            return round(enrolled / capacity, 4) if capacity else None
+
+        return CoachStats(
+            coach_id=coach_id,
+            workouts_total=workouts_total,
+            upcoming_workouts=upcoming,
+            workout_enrollments=workout_enrollments,
+            workout_fill_rate=fill_rate(workout_limited, workout_capacity),
+            workout_revenue=workout_revenue,
+            courses_total=courses_total,
+            course_enrollments=course_enrollments,
+            course_fill_rate=fill_rate(course_limited, course_capacity),
+            course_revenue=course_revenue,
+            total_revenue=workout_revenue + course_revenue,
+        )
+
+    async def set_profile_photo(self, user_id: int, photo: dict) -> User:
+        """Сохранение ссылок на фото профиля и его варианты"""
+        user = await self.session.get(User, user_id)
+        user.profile_photo_url = photo["url"]
+        user.profile_photo_variants = photo["variants"]
+        await self.session.commit()
+        if user.is_coach:
+            # Данные тренера встроены в ответы со списками тренировок и курсов
+            await response_cache.invalidate(COACHES, WORKOUTS, COURSES, coach_tag(user_id))
+        return user
+
+    async def upload_profile_photo(self, user: User, file: UploadFile) -> User:
+        """Загрузка фото профиля через API"""
+        photo = await upload_profile_photo(file, user.id)
+        if not photo:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Не удалось загрузить файл"
+            )
+        return await self.set_profile_photo(user.id, photo)
+
+    def create_photo_upload(self, user: User, content_type: str) -> PhotoUploadTicket:
+        """Параметры прямой загрузки фото в хранилище, минуя API"""
+        if content_type not in ALLOWED_IMAGE_TYPES:
+            raise unsupported_image_error()
+        key = new_photo_key(user.id, content_type)
+        ticket = get_storage().presign_upload(key, content_type, PRESIGNED_UPLOAD_EXPIRE_SECONDS)
+        return PhotoUploadTicket(key=key, expires_in=PRESIGNED_UPLOAD_EXPIRE_SECONDS, **ticket)
+
+    async def confirm_photo_upload(self, user: User, key: str) -> User:
+        """Проверка загруженного напрямую файла и привязка его к профилю"""
+        # Ключ удаляется ниже, поэтому принимаем только ключи ровно в формате new_photo_key
+        if not is_photo_upload_key(key, user.id):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Файл принадлежит другому пользователю"
+            )
+        storage = get_storage()
+        size = await storage.stat(key)
+        if size is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Файл не найден"
+            )
+        if size > UPLOAD_MAX_BYTES:
+            await storage.delete(key)
+            raise too_large_error()
+        if detect_image_type(await storage.read_head(key)) not in ALLOWED_IMAGE_TYPES:
+            await storage.delete(key)
+            raise unsupported_image_error()
+        # Исходник клиента не отдаём: храним только пересжатые варианты без EXIF
+        try:
+            photo = await store_profile_photo(await storage.read(key))
+        finally:
+            await storage.delete(key)
+        return await self.set_profile_photo(user.id, photo)
+
 # Роуты для пользователей
 @router.post("/", response_model=UserResponse)
 async def create_user(
@@ -146,6 +290,41 @@ async def get_current_user_info(
 ):
     return current_user
 
+async def upload_profile_photo_route(
+    file: UploadFile = File(...),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Загрузка фото профиля через API"""
+    controller = UserController(db)
+    return await controller.upload_profile_photo(current_user, file)
+
+# Лимит размера проверяется до разбора multipart-формы
+router.add_api_route(
+    "/profile/photo", upload_profile_photo_route, methods=["POST"],
+    response_model=UserResponse, route_class_override=LimitedUploadRoute
+)
+
+@router.post("/profile/photo/upload-url", response_model=PhotoUploadTicket)
+async def create_photo_upload(
+    upload_request: PhotoUploadRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Ссылка для прямой загрузки фото в хранилище"""
+    controller = UserController(db)
+    return controller.create_photo_upload(current_user, upload_request.content_type)
+
+@router.post("/profile/photo/confirm", response_model=UserResponse)
+async def confirm_photo_upload(
+    confirm: PhotoUploadConfirm,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Подтверждение прямой загрузки фото"""
+    controller = UserController(db)
+    return await controller.confirm_photo_upload(current_user, confirm.key)
+
 # Роуты для тренеров
 @coach_router.post("/", response_model=UserResponse)
 async def create_coach(
@@ -157,15 +336,35 @@ async def create_coach(
 
 @coach_router.get("/", response_model=CoachList)
 async def get_all_coaches(
+    request: Request,
+    shape: Optional[ResponseShape] = Depends(shape_params(UserResponse)),
     db: AsyncSession = Depends(get_db)
 ):
+    """Список тренеров. fields задаёт набор полей"""
     controller = UserController(db)
-    return await controller.get_all_coaches()
+    return await response_cache.respond(
+        request, COACHES, CoachList, lambda: controller.get_all_coaches(shape), shape
+    )
 
 @coach_router.get("/{coach_id}", response_model=CoachResponse)
 async def get_coach_with_workouts(
+    coach_id: int,
+    request: Request,
+    shape: Optional[ResponseShape] = Depends(shape_params(CoachResponse)),
+    db: AsyncSession = Depends(get_db)
+):
+    """Тренер с тренировками и курсами. fields / expand / format задают
+    набор полей и вложенных объектов"""
+    controller = UserController(db)
+    return await response_cache.respond(
+        request, coach_tag(coach_id), CoachResponse,
+        lambda: controller.get_coach_with_workouts(coach_id, shape), shape
+    )
+
+@coach_router.get("/{coach_id}/stats", response_model=CoachStats)
+async def get_coach_stats(
     coach_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     controller = UserController(db)
-    return await controller.get_coach_with_workouts(coach_id) 
\ No newline at end of file
+    return await controller.get_coach_stats(coach_id)
@@ -1,16 +1,73 @@
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_
+from sqlalchemy import and_, delete, func, insert, select, tuple_, update
 from sqlalchemy.orm import joinedload
-from app.models.workout import Workout
+from app.models.workout import Workout, WorkoutSeries, workout_enrollments, workout_waitlist
+from app.models.course import course_workouts
 from app.models.user import User
-from app.schemas.workout_schemas import WorkoutCreate, WorkoutListWithCoach, WorkoutListWithEnrolledUsers, WorkoutResponse, WorkoutList
-from fastapi import HTTPException, status, APIRouter, Depends
+from app.schemas.workout_schemas import (
+    WorkoutCreate, WorkoutListWithCoach, WorkoutListWithEnrolledUsers, WorkoutResponse, WorkoutList, WorkoutWithCoach,
+    WorkoutSeriesCreate, WorkoutSeriesUpdate, WorkoutSeriesResponse, WorkoutSeriesCancelled
+)
+from fastapi import HTTPException, status, APIRouter, Depends, Query, Request
+from fastapi.responses import StreamingResponse
 from app.core.database import get_db
-from app.core.auth import get_current_user, get_current_coach
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, encode_cursor, decode_cursor
+from app.core.search import MIN_SEARCH_LENGTH, text_match
+from app.core.seats import SeatAllocator, EnrollmentStatus
+from app.core.response_cache import response_cache, WORKOUTS, COURSES, coach_tag
+from app.core.etag import make_etag, etag_matches, not_modified, set_etag
+from app.core.serialization import ResponseShape, json_response, shape_params
+from app.core.export import EXPORT_FORMAT_PATTERN, export_response
+from app.core.recurrence import expand_rrule
+from app.core.auth import get_current_user, get_current_coach, require_export_access
 
 router = APIRouter(prefix="/workouts", tags=["workouts"])
 my_router = APIRouter(prefix="/my/workouts", tags=["my-workouts"])
 
+workout_seats = SeatAllocator(Workout.__table__, workout_enrollments, workout_waitlist, "workout_id")
+
+# Поля, которые в правке серии нельзя сбросить в null
+SERIES_REQUIRED_FIELDS = {"title", "description", "address", "sport_type"}
+
+def _workout_load_options(shape: Optional[ResponseShape] = None) -> list:
+    """Опции загрузки ленты: тренер подгружается, только если он нужен в ответе,
+    колонки - только запрошенные в fields (datetime и id нужны для курсора)"""
+    if shape is None:
+        return [joinedload(Workout.coach)]
+    options = shape.load_only(Workout, "id", "datetime", "coach_id")
+    if shape.expands("coach"):
+        options.append(shape.loader(Workout.coach))
+    return options
+
+def _filter_workouts(
+    query,
+    upcoming: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    sport_type: Optional[str] = None,
+    price_min: Optional[float] = None,
+    price_max: Optional[float] = None,
+    coach_id: Optional[int] = None,
+):
+    """Фильтры ленты тренировок"""
+    if upcoming:
+        query = query.where(Workout.datetime >= datetime.utcnow())
+    if date_from:
+        query = query.where(Workout.datetime >= date_from.replace(tzinfo=None))
+    if date_to:
+        query = query.where(Workout.datetime <= date_to.replace(tzinfo=None))
+    if sport_type:
+        query = query.where(Workout.sport_type == sport_type)
+    if price_min is not None:
+        query = query.where(Workout.price >= price_min)
+    if price_max is not None:
+        query = query.where(Workout.price <= price_max)
+    if coach_id is not None:
+        query = query.where(Workout.coach_id == coach_id)
+    return query
+
 class WorkoutController:
     def __init__(self, session: AsyncSession):
         self.session = session
@@ -26,34 +83,198 @@ class WorkoutController:
             address=workout_data.address,
             price=workout_data.price,
             sport_type=workout_data.sport_type,
+            capacity=workout_data.capacity,
             coach_id=coach_id
         )
         self.session.add(new_workout)
         await self.session.commit()
         await self.session.refresh(new_workout)
+        await response_cache.invalidate(WORKOUTS, coach_tag(coach_id))
         return new_workout
 
-    async def get_all_workouts(self, search: str = None) -> WorkoutListWithCoach:
-        """Получение списка всех тренировок"""
-        query = (
-            select(Workout)
-            .options(joinedload(Workout.coach))
+    async def create_series(self, series_data: WorkoutSeriesCreate, coach_id: int) -> WorkoutSeriesResponse:
+        """Создание серии: даты раскрываются по правилу повторения,
+        все занятия вставляются одним INSERT ... RETURNING"""
+        start = series_data.start.replace(tzinfo=None)
+        occurrences = expand_rrule(series_data.rrule, start)
+
+        series = WorkoutSeries(coach_id=coach_id, rrule=series_data.rrule.strip(), start=start)
+        self.session.add(series)
+        await self.session.flush()
+
+        fields = series_data.model_dump(exclude={"start", "rrule"})
+        result = await self.session.execute(
+            insert(Workout).returning(Workout, sort_by_parameter_order=True),
+            [
+                dict(fields, datetime=moment, coach_id=coach_id, series_id=series.id, is_course_part=False)
+                for moment in occurrences
+            ],
         )
-        
+        workouts = result.scalars().all()
+        await self.session.commit()
+        await response_cache.invalidate(WORKOUTS, coach_tag(coach_id))
+        return WorkoutSeriesResponse.model_construct(
+            id=series.id, coach_id=coach_id, rrule=series.rrule, start=start, workouts=workouts
+        )
+
+    async def _series_occurrence(self, workout_id: int, coach_id: int) -> Tuple[int, datetime]:
+        """Серия и дата занятия, от которого применяется правка «это и следующие»"""
+        row = (await self.session.execute(
+            select(Workout.series_id, Workout.datetime).where(
+                Workout.id == workout_id,
+                Workout.coach_id == coach_id
+            )
+        )).first()
+        if row is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Тренировка не найдена или у вас нет прав на её изменение"
+            )
+        if row.series_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Тренировка не входит в серию"
+            )
+        return row.series_id, row.datetime
+
+    async def update_following(
+        self, workout_id: int, changes_data: WorkoutSeriesUpdate, coach_id: int
+    ) -> WorkoutSeriesResponse:
+        """Правка занятия и всех следующих в серии одним UPDATE"""
+        series_id, pivot = await self._series_occurrence(workout_id, coach_id)
+        changes = {
+            name: value for name, value in changes_data.model_dump(exclude_unset=True).items()
+            if value is not None or name not in SERIES_REQUIRED_FIELDS
+        }
+        shift_minutes = changes.pop("shift_minutes", None)
+        if shift_minutes:
+            changes["datetime"] = Workout.datetime + timedelta(minutes=shift_minutes)
+        if not changes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Нет изменений"
+            )
+
+        following = and_(Workout.series_id == series_id, Workout.datetime >= pivot)
+        capacity = changes.get("capacity")
+        condition = following
+        if capacity is not None:
+            total = await self.session.scalar(select(func.count()).select_from(Workout).where(following))
+            # Вместимость не может стать меньше числа уже записанных
+            condition = and_(following, Workout.enrolled_count <= capacity)
+
+        result = await self.session.execute(
+            update(Workout).where(condition).values(**changes).returning(Workout),
+            execution_options={"synchronize_session": False},
+        )
+        workouts = result.scalars().all()
+        if capacity is not None and len(workouts) < total:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="На часть занятий записано больше участников, чем новая вместимость"
+            )
+
+        if "capacity" in changes and workouts:
+            # Появившиеся места получают первые в листах ожидания
+            ids = [workout.id for workout in workouts]
+            await workout_seats.fill_from_waitlist(self.session, ids)
+            result = await self.session.execute(
+                select(Workout).where(Workout.id.in_(ids)).execution_options(populate_existing=True)
+            )
+            workouts = result.scalars().all()
+
+        series = await self.session.get(WorkoutSeries, series_id)
+        await self.session.commit()
+        await response_cache.invalidate(WORKOUTS, COURSES, coach_tag(coach_id))
+        return WorkoutSeriesResponse.model_construct(
+            id=series.id, coach_id=series.coach_id, rrule=series.rrule, start=series.start,
+            workouts=sorted(workouts, key=lambda workout: (workout.datetime, workout.id)),
+        )
+
+    async def cancel_following(self, workout_id: int, coach_id: int) -> WorkoutSeriesCancelled:
+        """Отмена занятия и всех следующих в серии: записи, связи с курсами и
+        сами занятия удаляются набором, без загрузки объектов"""
+        series_id, pivot = await self._series_occurrence(workout_id, coach_id)
+        following = and_(Workout.series_id == series_id, Workout.datetime >= pivot)
+        ids = select(Workout.id).where(following).scalar_subquery()
+
+        await self.session.execute(delete(workout_enrollments).where(workout_enrollments.c.workout_id.in_(ids)))
+        await self.session.execute(delete(course_workouts).where(course_workouts.c.workout_id.in_(ids)))
+        # Лист ожидания удаляется каскадом (ON DELETE CASCADE)
+        result = await self.session.execute(
+            delete(Workout).where(following).returning(Workout.id),
+            execution_options={"synchronize_session": False},
+        )
+        cancelled = len(result.all())
+
+        remaining = await self.session.scalar(
+            select(func.count()).select_from(Workout).where(Workout.series_id == series_id)
+        )
+        if not remaining:
+            await self.session.execute(delete(WorkoutSeries).where(WorkoutSeries.id == series_id))
+        await self.session.commit()
+        await response_cache.invalidate(WORKOUTS, COURSES, coach_tag(coach_id))
+        return WorkoutSeriesCancelled(series_id=series_id, cancelled=cancelled)
+
+    async def get_all_workouts(
+        self,
+        search: str = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: Optional[str] = None,
+        upcoming: bool = False,
+        date_from: Optional[datetime] = None,
+        date_to: Optional[datetime] = None,
+        sport_type: Optional[str] = None,
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+        coach_id: Optional[int] = None,
+        shape: Optional[ResponseShape] = None,
+    ) -> WorkoutListWithCoach:
+        """Лента тренировок с фильтрами и keyset-пагинацией по (datetime, id)"""
+        query = _filter_workouts(
+            select(Workout).options(*_workout_load_options(shape)),
+            upcoming, date_from, date_to, sport_type, price_min, price_max, coach_id
+        )
+
         if search:
-            search_term = f"%{search}%"
+            # Результаты поиска упорядочены по релевантности, курсор к ним не применяется
+            condition, rank = text_match(Workout.search_vector, Workout.title, search)
+            query = query.where(condition).order_by(rank.desc(), Workout.id).limit(limit)
+            result = await self.session.execute(query)
+            return WorkoutListWithCoach.model_construct(workouts=result.scalars().all())
+
+        # Тренировки без даты (её можно не заполнить в админке) в ленту не попадают:
+        # курсор и сравнение по (datetime, id) требуют непустой даты
+        query = query.where(Workout.datetime.isnot(None))
+        if cursor:
+            after_datetime, after_id = decode_cursor(cursor)
             query = query.where(
-                or_(
-                    Workout.title.ilike(search_term),
-                    Workout.sport_type.ilike(search_term)
-                )
+                tuple_(Workout.datetime, Workout.id) > tuple_(after_datetime, after_id)
             )
-        
-        query = query.order_by(Workout.datetime)
-        
+
+        # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+        query = query.order_by(Workout.datetime, Workout.id).limit(limit + 1)
+
         result = await self.session.execute(query)
         workouts = result.scalars().all()
-        return WorkoutListWithCoach(workouts=workouts)
+
+        next_cursor = None
+        if len(workouts) > limit:
+            workouts = workouts[:limit]
+            last = workouts[-1]
+            next_cursor = encode_cursor(last.datetime, last.id)
+        # Без валидации: ответ сериализуется по схеме роута (app.core.serialization)
+        return WorkoutListWithCoach.model_construct(workouts=workouts, next_cursor=next_cursor)
+
+    @staticmethod
+    def export_workouts(export_format: str, **filters) -> StreamingResponse:
+        """Потоковая выгрузка тренировок (NDJSON или CSV) в порядке (datetime, id)"""
+        query = (
+            _filter_workouts(select(Workout).options(joinedload(Workout.coach)), **filters)
+            .order_by(Workout.datetime, Workout.id)
+        )
+        return export_response(query, WorkoutWithCoach, export_format, "workouts")
 
     async def delete_workout(self, workout_id: int, coach_id: int) -> None:
         """Удаление тренировки"""
@@ -72,90 +293,84 @@ class WorkoutController:
 
         await self.session.delete(workout)
         await self.session.commit()
+        await response_cache.invalidate(WORKOUTS, COURSES, coach_tag(coach_id))
+
+    async def _invalidate_workout(self, workout_id: int) -> None:
+        """Сброс кешированных ответов, в которых видна тренировка"""
+        coach_id = await self.session.scalar(select(Workout.coach_id).where(Workout.id == workout_id))
+        await self.session.commit()
+        await response_cache.invalidate(WORKOUTS, COURSES, coach_tag(coach_id))
 
-    async def enroll_to_workout(self, workout_id: int, user: User) -> Workout:
-        """Запись на тренировку"""
+    async def enroll_to_workout(self, workout_id: int, user: User) -> Optional[int]:
+        """Запись на тренировку. Если мест нет, пользователь встаёт в лист ожидания;
+        возвращается позиция в нём (None - записан сразу)"""
         if user.is_coach:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Тренеры не могут записываться на тренировки"
             )
 
-        # Загружаем тренировку
-        result = await self.session.execute(
-            select(Workout).where(Workout.id == workout_id)
-        )
-        workout = result.scalars().first()
-        if not workout:
+        result, position = await workout_seats.enroll(self.session, workout_id, user.id)
+        if result == EnrollmentStatus.NOT_FOUND:
+            await self.session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Тренировка не найдена"
             )
-
-        # Загружаем пользователя со всеми его тренировками
-        result = await self.session.execute(
-            select(User)
-            .options(joinedload(User.enrolled_workouts))
-            .where(User.id == user.id)
-        )
-        user = result.unique().scalars().first()
-
-        if workout in user.enrolled_workouts:
+        if result == EnrollmentStatus.ALREADY_ENROLLED:
+            await self.session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Вы уже записаны на эту тренировку"
             )
+        if result == EnrollmentStatus.ALREADY_WAITLISTED:
+            await self.session.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Вы уже в листе ожидания этой тренировки"
+            )
 
-        user.enrolled_workouts.append(workout)
-        await self.session.commit()
-        await self.session.refresh(workout)
-        return workout
+        if position is None:
+            # Изменился enrolled_count в публичных ответах
+            await self._invalidate_workout(workout_id)
+        else:
+            await self.session.commit()
+        return position
 
-    async def unenroll_from_workout(self, workout_id: int, user: User) -> None:
-        """Отмена записи на тренировку"""
+    async def unenroll_from_workout(self, workout_id: int, user: User) -> EnrollmentStatus:
+        """Отмена записи на тренировку или выход из листа ожидания"""
         if user.is_coach:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Тренеры не могут отписываться от тренировок"
             )
 
-        # Загружаем тренировку
-        result = await self.session.execute(
-            select(Workout).where(Workout.id == workout_id)
-        )
-        workout = result.scalars().first()
-        if not workout:
+        result = await workout_seats.unenroll(self.session, workout_id, user.id)
+        if result == EnrollmentStatus.NOT_FOUND:
+            await self.session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Тренировка не найдена"
             )
-
-        # Загружаем пользователя со всеми его тренировками
-        result = await self.session.execute(
-            select(User)
-            .options(joinedload(User.enrolled_workouts))
-            .where(User.id == user.id)
-        )
-        user = result.unique().scalars().first()
-
-        if workout not in user.enrolled_workouts:
+        if result == EnrollmentStatus.NOT_ENROLLED:
+            await self.session.rollback()
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Вы не записаны на эту тренировку"
             )
 
-        user.enrolled_workouts.remove(workout)
-        await self.session.commit()
+        if result == EnrollmentStatus.UNENROLLED:
+            await self._invalidate_workout(workout_id)
+        else:
+            await self.session.commit()
+        return result
 
     async def get_my_workouts(self, user: User) -> WorkoutListWithEnrolledUsers:
         """Получение списка тренировок пользователя"""
         if user.is_coach:
             query = (
                 select(Workout)
-                .options(
-                    joinedload(Workout.coach),
-                    joinedload(Workout.enrolled_users)
-                )
+                .options(joinedload(Workout.coach))
                 .where(Workout.coach_id == user.id)
             )
         else:
@@ -167,8 +382,25 @@ class WorkoutController:
             )
 
         result = await self.session.execute(query)
-        workouts = result.unique().scalars().all()
-        return WorkoutListWithEnrolledUsers(workouts=workouts)
+        workouts = result.scalars().all()
+        return WorkoutListWithEnrolledUsers.model_construct(workouts=workouts)
+
+    async def get_my_workouts_etag(self, user: User) -> str:
+        """ETag списка тренировок пользователя по версиям строк, без загрузки объектов"""
+        query = (
+            select(Workout.id, Workout.updated_at, User.updated_at)
+            .join(User, User.id == Workout.coach_id)
+            .order_by(Workout.id)
+        )
+        if user.is_coach:
+            query = query.where(Workout.coach_id == user.id)
+        else:
+            query = query.join(
+                workout_enrollments, workout_enrollments.c.workout_id == Workout.id
+            ).where(workout_enrollments.c.user_id == user.id)
+
+        result = await self.session.execute(query)
+        return make_etag(result.all())
 
     async def get_workout(self, workout_id: int) -> Workout:
         """Получение тренировки по ID"""
@@ -193,14 +425,80 @@ async def create_workout(
     current_user: User = Depends(get_current_coach)
 ):
     controller = WorkoutController(db)
-    return await controller.create_workout(workout_data, current_user)
+    return await controller.create_workout(workout_data, current_user.id)
+
+@router.post("/series", response_model=WorkoutSeriesResponse)
+async def create_workout_series(
+    series_data: WorkoutSeriesCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_coach)
+):
+    """Серия тренировок по правилу повторения (RRULE): все занятия создаются одним запросом"""
+    controller = WorkoutController(db)
+    return json_response(WorkoutSeriesResponse, await controller.create_series(series_data, current_user.id))
 
-@router.get("/", response_model=WorkoutList)
+@router.get("/", response_model=WorkoutListWithCoach)
 async def get_all_workouts(
+    request: Request,
+    search: Optional[str] = Query(None, min_length=MIN_SEARCH_LENGTH),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    upcoming: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    sport_type: Optional[str] = None,
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    coach_id: Optional[int] = None,
+    shape: Optional[ResponseShape] = Depends(shape_params(WorkoutWithCoach)),
     db: AsyncSession = Depends(get_db)
 ):
+    """Лента тренировок. Следующая страница запрашивается по next_cursor,
+    при поиске выдача упорядочена по релевантности. fields / expand / format
+    задают набор полей и вложенных объектов"""
     controller = WorkoutController(db)
-    return await controller.get_all_workouts()
+    return await response_cache.respond(
+        request, WORKOUTS, WorkoutListWithCoach,
+        lambda: controller.get_all_workouts(
+            search=search,
+            limit=limit,
+            cursor=cursor,
+            upcoming=upcoming,
+            date_from=date_from,
+            date_to=date_to,
+            sport_type=sport_type,
+            price_min=price_min,
+            price_max=price_max,
+            coach_id=coach_id,
+            shape=shape,
+        ),
+        shape,
+    )
+
+@router.get("/export", response_class=StreamingResponse, dependencies=[Depends(require_export_access)])
+async def export_workouts(
+    export_format: str = Query("ndjson", alias="format", pattern=EXPORT_FORMAT_PATTERN),
+    upcoming: bool = False,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    sport_type: Optional[str] = None,
+    price_min: Optional[float] = Query(None, ge=0),
+    price_max: Optional[float] = Query(None, ge=0),
+    coach_id: Optional[int] = None
+):
+    """Выгрузка всего каталога тренировок потоком: NDJSON (объекты как в
+    ленте) или CSV (простые поля). Фильтры - как у ленты. Только для
+    администраторов и партнёров (X-API-Key)"""
+    return WorkoutController.export_workouts(
+        export_format,
+        upcoming=upcoming,
+        date_from=date_from,
+        date_to=date_to,
+        sport_type=sport_type,
+        price_min=price_min,
+        price_max=price_max,
+        coach_id=coach_id,
+    )
 
 @router.get("/{workout_id}", response_model=WorkoutResponse)
 async def get_workout(
@@ -210,6 +508,29 @@ async def get_workout(
     controller = WorkoutController(db)
     return await controller.get_workout(workout_id)
 
+@router.patch("/{workout_id}/following", response_model=WorkoutSeriesResponse)
+async def update_following_workouts(
+    workout_id: int,
+    changes: WorkoutSeriesUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_coach)
+):
+    """Изменение занятия серии и всех следующих за ним"""
+    controller = WorkoutController(db)
+    return json_response(
+        WorkoutSeriesResponse, await controller.update_following(workout_id, changes, current_user.id)
+    )
+
+@router.delete("/{workout_id}/following", response_model=WorkoutSeriesCancelled)
+async def cancel_following_workouts(
+    workout_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_coach)
+):
+    """Отмена занятия серии и всех следующих за ним"""
+    controller = WorkoutController(db)
+    return await controller.cancel_following(workout_id, current_user.id)
+
 @router.post("/{workout_id}/enroll")
 async def enroll_to_workout(
     workout_id: int,
@@ -218,7 +539,9 @@ async def enroll_to_workout(
 ):
     """Запись на тренировку"""
     controller = WorkoutController(db)
-    await controller.enroll_to_workout(workout_id, current_user)
+    position = await controller.enroll_to_workout(workout_id, current_user)
+    if position is not None:
+        return {"message": "Added to workout waitlist", "waitlist_position": position}
     return {"message": "Successfully enrolled to workout"}
 
 @router.post("/{workout_id}/unenroll")
@@ -229,17 +552,27 @@ async def unenroll_from_workout(
 ):
     """Отмена записи на тренировку"""
     controller = WorkoutController(db)
-    await controller.unenroll_from_workout(workout_id, current_user)
+    result = await controller.unenroll_from_workout(workout_id, current_user)
+    if result == EnrollmentStatus.LEFT_WAITLIST:
+        return {"message": "Removed from workout waitlist"}
     return {"message": "Successfully unenrolled from workout"}
 
 # Роуты для личных тренировок
 @my_router.get("/", response_model=WorkoutListWithEnrolledUsers)
 async def get_my_workouts(
+    request: Request,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
+    """Тренировки пользователя. Поддерживает If-None-Match: если список
+    не изменился, возвращается 304 без загрузки и сериализации"""
     controller = WorkoutController(db)
-    return await controller.get_my_workouts(current_user)
+    etag = await controller.get_my_workouts_etag(current_user)
+    if etag_matches(request, etag):
+        return not_modified(etag, private=True)
+    response = json_response(WorkoutListWithEnrolledUsers, await controller.get_my_workouts(current_user))
+    set_etag(response, etag, private=True)
+    return response
 
 @my_router.get("/{workout_id}", response_model=WorkoutResponse)
 async def get_my_workout(
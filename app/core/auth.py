@@ -1,12 +1,17 @@
+import hmac
+import os
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
-from fastapi.security import OAuth2PasswordBearer
+from fastapi import Depends, HTTPException, Security, status
+from fastapi.security import APIKeyHeader, OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, event, inspect
+from sqlalchemy.orm import Session, object_session
+from app.core.cache import TTLCache
 from app.core.database import get_db
+from app.core.hashing import pwd_context, password_hasher
 from app.models.user import User
 
 # Настройки JWT
@@ -14,21 +19,36 @@ SECRET_KEY = "your-secret-key-here"  # В продакшене использу
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_DAYS = 30
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Кеш аутентифицированных пользователей (в памяти процесса)
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL_SECONDS = int(os.getenv("TOKEN_CACHE_TTL_SECONDS", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Ключи администраторов и партнёров для массовой выгрузки каталога
+# (заголовок X-API-Key), через запятую. Пусто - выгрузка выключена
+EXPORT_API_KEYS = [key.strip() for key in os.getenv("EXPORT_API_KEYS", "").split(",") if key.strip()]
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+export_api_key = APIKeyHeader(name="X-API-Key", auto_error=False)
+
+# email -> отсоединённый от сессии User
+principal_cache = TTLCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL_SECONDS)
+# токен -> проверенный payload
+token_cache = TTLCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify(plain_password, hashed_password)
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+async def get_password_hash(password: str) -> str:
+    return await password_hasher.hash(password)
 
 async def authenticate_user(email: str, password: str, session: AsyncSession) -> Optional[User]:
     result = await session.execute(select(User).where(User.email == email))
     user = result.scalars().first()
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return None
     return user
 
@@ -42,6 +62,41 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+def decode_access_token(token: str) -> dict:
+    """Проверка подписи JWT с мемоизацией уже проверенных токенов"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        exp = payload.get("exp")
+        # Запись не должна пережить сам токен
+        token_cache.set(token, payload, exp - time.time() if exp else None)
+    return payload
+
+def invalidate_principal(email: str) -> None:
+    principal_cache.pop(email)
+
+# Ключ Session.info: email пользователей, изменённых в текущей транзакции
+_CHANGED_PRINCIPALS = "changed_principals"
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _collect_changed_principal(mapper, connection, target):
+    # Во время flush изменения ещё не зафиксированы: если удалить запись
+    # из кеша сейчас, параллельный запрос перечитает старую строку и
+    # положит её обратно на весь TTL. Удаляем после commit
+    emails = object_session(target).info.setdefault(_CHANGED_PRINCIPALS, set())
+    emails.add(target.email)
+    emails.update(inspect(target).attrs.email.history.deleted or ())
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_principals(session):
+    for email in session.info.pop(_CHANGED_PRINCIPALS, ()):
+        invalidate_principal(email)
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_principals(session):
+    session.info.pop(_CHANGED_PRINCIPALS, None)
+
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
     session: AsyncSession = Depends(get_db)
@@ -52,17 +107,27 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
     
+    user = principal_cache.get(email)
+    if user is not None:
+        return user
+
     result = await session.execute(select(User).where(User.email == email))
     user = result.scalars().first()
     if user is None:
         raise credentials_exception
+    # Отсоединяем объект, чтобы его можно было безопасно отдавать другим запросам
+    session.expunge(user)
+    # Завершаем читающую транзакцию: соединение возвращается в пул,
+    # а обработчик может открыть собственную транзакцию на той же сессии
+    await session.commit()
+    principal_cache.set(email, user)
     return user
 
 async def get_current_coach(current_user: User = Depends(get_current_user)) -> User:
@@ -71,4 +136,20 @@ async def get_current_coach(current_user: User = Depends(get_current_user)) -> U
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Требуются права тренера"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
+
+async def require_export_access(api_key: Optional[str] = Security(export_api_key)) -> None:
+    """Доступ к выгрузкам каталога: только по ключу из EXPORT_API_KEYS"""
+    if not api_key:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Требуется ключ API",
+            headers={"WWW-Authenticate": "ApiKey"},
+        )
+    # Сравниваем со всеми ключами за постоянное время
+    matches = [hmac.compare_digest(api_key.encode(), key.encode()) for key in EXPORT_API_KEYS]
+    if not any(matches):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Выгрузка доступна только администраторам и партнёрам"
+        ) 
\ No newline at end of file
@@ -0,0 +1,39 @@
+import hashlib
+from typing import Iterable
+
+from fastapi import Request, Response
+
+
+def make_etag(rows: Iterable) -> str:
+    """Слабый ETag по версиям строк: (id, updated_at, ...) всего, что входит в ответ"""
+    digest = hashlib.sha1(repr(list(rows)).encode()).hexdigest()
+    return f'W/"{digest}"'
+
+
+def body_etag(body: bytes) -> str:
+    """Сильный ETag готового тела ответа"""
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Проверка If-None-Match (слабое сравнение, RFC 9110)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def set_etag(response: Response, etag: str, private: bool = False) -> None:
+    response.headers["ETag"] = etag
+    # no-cache: клиент может хранить ответ, но обязан перепроверять его по ETag
+    response.headers["Cache-Control"] = "private, no-cache" if private else "no-cache"
+
+
+def not_modified(etag: str, private: bool = False) -> Response:
+    """Ответ 304 без тела"""
+    response = Response(status_code=304)
+    set_etag(response, etag, private)
+    return response
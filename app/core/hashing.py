@@ -0,0 +1,72 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.metrics import PASSWORD_HASHING, timed
+
+# Настройки пула хеширования
+# bcrypt отпускает GIL, поэтому потоков достаточно для разгрузки event loop
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", "4"))
+HASHING_MAX_PENDING = int(os.getenv("HASHING_MAX_PENDING", "64"))
+HASHING_RETRY_AFTER_SECONDS = int(os.getenv("HASHING_RETRY_AFTER_SECONDS", "1"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class PasswordHasher:
+    """Хеширование паролей в ограниченном пуле потоков с защитой от перегрузки"""
+
+    def __init__(self, context: CryptContext, max_workers: int, max_pending: int):
+        self.context = context
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Количество операций в работе и в очереди"""
+        return self._in_flight
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="bcrypt"
+            )
+        return self._executor
+
+    async def _run(self, operation: str, func, *args):
+        # Счётчик меняется только из event loop, блокировка не нужна
+        if self._in_flight >= self.max_workers + self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Сервер перегружен, повторите попытку позже",
+                headers={"Retry-After": str(HASHING_RETRY_AFTER_SECONDS)},
+            )
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), timed, PASSWORD_HASHING.labels(operation), func, *args
+            )
+        finally:
+            self._in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run("hash", self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run("verify", self.context.verify, plain_password, hashed_password)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(pwd_context, HASHING_WORKERS, HASHING_MAX_PENDING)
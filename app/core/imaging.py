@@ -0,0 +1,53 @@
+"""
+Обработка изображений в отдельных процессах.
+
+Модуль намеренно не импортирует ничего из приложения: его загружают
+процессы-обработчики пула, запущенные через spawn.
+"""
+import io
+from typing import Dict, Tuple
+
+from PIL import Image, ImageOps
+
+try:
+    # HEIC с телефонов читается, только если установлен pillow-heif
+    from pillow_heif import register_heif_opener
+    register_heif_opener()
+except ImportError:
+    pass
+
+# Защита от "декомпрессионных бомб"
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+# Максимальная сторона для каждого варианта
+PHOTO_VARIANT_SIZES = {
+    "thumb": 128,
+    "small": 320,
+    "medium": 640,
+    "full": 1600,
+}
+
+PHOTO_FORMATS = {
+    "webp": ("WEBP", "image/webp", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", "image/jpeg", {"quality": 82, "optimize": True, "progressive": True}),
+}
+
+
+def render_variants(data: bytes) -> Dict[Tuple[str, str], Tuple[bytes, str]]:
+    """Декодирует изображение, поворачивает по EXIF и пересжимает во все
+    варианты размеров и форматов. Метаданные (EXIF, GPS) не переносятся.
+    Возвращает {(вариант, формат): (байты, content type)}"""
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        # Новое изображение без info/exif исходника
+        image = image.convert("RGB")
+
+    variants = {}
+    for variant, max_side in PHOTO_VARIANT_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        for fmt, (pil_format, content_type, options) in PHOTO_FORMATS.items():
+            out = io.BytesIO()
+            resized.save(out, pil_format, **options)
+            variants[(variant, fmt)] = (out.getvalue(), content_type)
+    return variants
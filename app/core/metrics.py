@@ -0,0 +1,130 @@
+"""
+Метрики приложения в формате Prometheus (GET /metrics).
+
+Для нескольких воркеров uvicorn/gunicorn задайте PROMETHEUS_MULTIPROC_DIR
+(пустой каталог, общий для воркеров) до запуска процессов: prometheus_client
+выбирает хранилище значений при импорте. Тогда каждый процесс пишет значения
+в mmap-файлы, а /metrics любого воркера агрегирует их все. Без переменной
+метрики живут в памяти процесса.
+"""
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from prometheus_client import multiprocess
+
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR") or os.getenv("prometheus_multiproc_dir")
+
+# Границы корзин в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+HASHING_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки HTTP-запроса",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP-запросы в обработке",
+    ["method"],
+    multiprocess_mode="livesum",
+)
+POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Ожидание свободного соединения из пула БД",
+    buckets=POOL_WAIT_BUCKETS,
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    "db_pool_checkout_timeouts",
+    "Запросы соединения, не дождавшиеся свободного соединения",
+)
+PASSWORD_HASHING = Histogram(
+    "password_hashing_duration_seconds",
+    "Время bcrypt в пуле хеширования (без ожидания в очереди)",
+    ["operation"],
+    buckets=HASHING_BUCKETS,
+)
+STORAGE_UPLOAD_BYTES = Counter(
+    "storage_upload_bytes",
+    "Байты, записанные в хранилище файлов",
+    ["backend"],
+)
+STORAGE_UPLOAD_DURATION = Histogram(
+    "storage_upload_duration_seconds",
+    "Время записи объекта в хранилище файлов",
+    ["backend"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+def timed(histogram, func, *args):
+    """Вызов func(*args) с записью длительности в histogram (для пулов потоков)"""
+    started = time.perf_counter()
+    try:
+        return func(*args)
+    finally:
+        histogram.observe(time.perf_counter() - started)
+
+
+def render_metrics() -> bytes:
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
+
+def mark_process_dead() -> None:
+    """Убирает gauge-значения завершающегося воркера из агрегата"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class MetricsMiddleware:
+    """ASGI middleware: длительность запросов по шаблону маршрута и число
+    запросов в обработке. Маршрут берётся из scope["route"] после роутинга,
+    поэтому число меток не зависит от значений параметров пути"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        root_path = scope.get("root_path", "")
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            in_progress.dec()
+            REQUEST_LATENCY.labels(
+                method, self._route_label(scope, root_path), str(status_code)
+            ).observe(time.perf_counter() - started)
+
+    @staticmethod
+    def _route_label(scope, root_path: str) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        # Смонтированные приложения (админка, раздача файлов) - одной меткой на точку монтирования
+        mount = scope.get("root_path", "")[len(root_path):]
+        return f"{mount}/*" if mount else "unmatched"
+
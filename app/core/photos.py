@@ -0,0 +1,224 @@
+import asyncio
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, List, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from PIL import Image, UnidentifiedImageError
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.imaging import PHOTO_FORMATS, PHOTO_VARIANT_SIZES, render_variants
+from app.core.storage import (
+    PROFILE_PHOTO_PREFIX, UPLOAD_CHUNK_BYTES, get_storage, validate_image_upload
+)
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Процессов для декодирования и пересжатия изображений
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+
+# Вариант, ссылка на который сохраняется в User.profile_photo_url
+PRIMARY_VARIANT = ("full", "jpeg")
+
+# Обработанные фото лежат по хешу исходника: одинаковые файлы хранятся один раз
+CONTENT_PREFIX = f"{PROFILE_PHOTO_PREFIX}/sha256"
+
+# Объекты моложе этого возраста очистка не трогает: ссылка на них может быть ещё не сохранена
+ORPHAN_GRACE_SECONDS = int(os.getenv("PHOTO_ORPHAN_GRACE_SECONDS", str(24 * 3600)))
+CLEANUP_DELETE_BATCH = 100
+
+_image_executor: Optional[ProcessPoolExecutor] = None
+
+
+def _get_image_executor() -> ProcessPoolExecutor:
+    global _image_executor
+    if _image_executor is None:
+        # spawn: дочерние процессы не наследуют event loop и потоки сервера
+        _image_executor = ProcessPoolExecutor(
+            max_workers=IMAGE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _image_executor
+
+
+def shutdown_image_executor() -> None:
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(wait=False, cancel_futures=True)
+        _image_executor = None
+
+
+def _file_digest(fileobj) -> str:
+    """SHA-256 файла, читаемого частями"""
+    fileobj.seek(0)
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(UPLOAD_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+async def content_digest(fileobj) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, _file_digest, fileobj)
+
+
+def variant_key(digest: str, variant: str, fmt: str) -> str:
+    return f"{CONTENT_PREFIX}/{digest}/{variant}.{fmt}"
+
+
+async def reuse_stored_photo(digest: str) -> bool:
+    """Фото с таким хешем уже сохранено. Время изменения всех вариантов
+    обновляется, чтобы очистка (cleanup_orphan_photos) не удалила их, пока
+    ссылка на них ещё не записана в профиль. False, если какого-то варианта
+    нет: тогда фото нужно сохранить заново"""
+    storage = get_storage()
+    touched = await asyncio.gather(*[
+        storage.touch(variant_key(digest, variant, fmt))
+        for variant in PHOTO_VARIANT_SIZES
+        for fmt in PHOTO_FORMATS
+    ])
+    return all(touched)
+
+
+def photo_links(digest: str) -> Dict:
+    """Ссылки на все варианты фото с данным хешем"""
+    storage = get_storage()
+    variants = {
+        variant: {fmt: storage.public_url(variant_key(digest, variant, fmt)) for fmt in PHOTO_FORMATS}
+        for variant in PHOTO_VARIANT_SIZES
+    }
+    return {"url": variants[PRIMARY_VARIANT[0]][PRIMARY_VARIANT[1]], "variants": variants}
+
+
+async def store_profile_photo(data: bytes, digest: Optional[str] = None) -> Dict:
+    """Пересжимает фото в процессе-обработчике и сохраняет все варианты.
+    Если фото с таким содержимым уже загружалось, ничего не пишет
+    (digest - SHA-256 data, если уже посчитан вызывающим кодом).
+    Возвращает {"url": основной URL, "variants": {вариант: {формат: URL}}}"""
+    storage = get_storage()
+    if digest is None:
+        digest = hashlib.sha256(data).hexdigest()
+    primary_key = variant_key(digest, *PRIMARY_VARIANT)
+    if await storage.stat(primary_key) is not None and await reuse_stored_photo(digest):
+        return photo_links(digest)
+
+    loop = asyncio.get_running_loop()
+    try:
+        rendered = await loop.run_in_executor(_get_image_executor(), render_variants, data)
+    except BrokenProcessPool:
+        # Обработчик упал (например, по памяти): следующий запрос получит новый пул
+        shutdown_image_executor()
+        raise
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Не удалось обработать изображение"
+        )
+
+    # Основной вариант пишется последним: его наличие означает, что записаны все
+    primary_body, primary_type = rendered.pop(PRIMARY_VARIANT)
+    await asyncio.gather(*[
+        storage.save(io.BytesIO(body), variant_key(digest, variant, fmt), content_type)
+        for (variant, fmt), (body, content_type) in rendered.items()
+    ])
+    await storage.save(io.BytesIO(primary_body), primary_key, primary_type)
+    return photo_links(digest)
+
+
+async def upload_profile_photo(file: UploadFile, user_id: int) -> Optional[Dict]:
+    """Загрузка фото профиля через API: проверка, обработка и сохранение вариантов"""
+    if not file:
+        return None
+
+    await validate_image_upload(file)
+    try:
+        # Хеш считается потоково в пуле потоков; наличие фото с таким хешем
+        # проверяет store_profile_photo
+        digest = await content_digest(file.file)
+        return await store_profile_photo(await file.read(), digest)
+    except HTTPException:
+        raise
+    except Exception:
+        logger.exception("Error storing profile photo for user %s", user_id)
+        return None
+
+
+async def photo_reference_counts(session: AsyncSession, keys: Optional[Iterable[str]] = None) -> Counter:
+    """Число пользователей, ссылающихся на каждый ключ хранилища. С keys
+    читаются только пользователи, чьё фото лежит в каталогах этих ключей
+    (варианты фото хранятся рядом с основным)"""
+    storage = get_storage()
+    counts: Counter = Counter()
+    query = select(User.profile_photo_url, User.profile_photo_variants).where(
+        or_(User.profile_photo_url.isnot(None), User.profile_photo_variants.isnot(None))
+    )
+    if keys is not None:
+        directories = {key.rsplit("/", 1)[0] for key in keys}
+        query = query.where(or_(*[
+            User.profile_photo_url.startswith(storage.public_url(f"{directory}/"), autoescape=True)
+            for directory in directories
+        ]))
+    result = await session.stream(query)
+    async for url, variants in result:
+        urls = {url}
+        for formats in (variants or {}).values():
+            urls.update(formats.values())
+        for key in filter(None, map(storage.key_from_url, filter(None, urls))):
+            counts[key] += 1
+    return counts
+
+
+async def cleanup_orphan_photos(
+    session: AsyncSession,
+    grace_seconds: int = ORPHAN_GRACE_SECONDS,
+    dry_run: bool = False,
+) -> dict:
+    """Удаляет из хранилища фото профиля, на которые не ссылается ни один
+    пользователь: заменённые фото, неподтверждённые прямые загрузки и
+    недописанные файлы. Объекты моложе grace_seconds не удаляются"""
+    storage = get_storage()
+    counts = await photo_reference_counts(session)
+    # Ссылки прочитаны: не держим транзакцию открытой на время обхода хранилища
+    await session.commit()
+
+    threshold = time.time() - grace_seconds
+    objects = await storage.list(f"{PROFILE_PHOTO_PREFIX}/")
+    orphans = [key for key, modified in objects if counts[key] == 0 and modified < threshold]
+
+    deleted = 0
+    if not dry_run:
+        for start in range(0, len(orphans), CLEANUP_DELETE_BATCH):
+            batch = await _still_orphaned(session, orphans[start:start + CLEANUP_DELETE_BATCH], threshold)
+            await asyncio.gather(*[storage.delete(key) for key in batch])
+            deleted += len(batch)
+
+    return {
+        "objects": len(objects),
+        "referenced": sum(1 for key, _ in objects if counts[key]),
+        "orphans": len(orphans),
+        "deleted": deleted,
+    }
+
+
+async def _still_orphaned(session: AsyncSession, keys: List[str], threshold: float) -> List[str]:
+    """Повторная проверка пачки непосредственно перед удалением: с начала
+    обхода на объект могла появиться ссылка или его переиспользовала
+    загрузка того же файла (reuse_stored_photo обновляет время изменения)"""
+    storage = get_storage()
+    counts = await photo_reference_counts(session, keys)
+    await session.commit()
+    modified = await asyncio.gather(*[storage.modified(key) for key in keys])
+    return [
+        key for key, mtime in zip(keys, modified)
+        if counts[key] == 0 and mtime is not None and mtime < threshold
+    ]
@@ -0,0 +1,164 @@
+"""
+Счётчики SQL-запросов на запрос к API.
+
+Слушатели событий движка (before/after_cursor_execute) записывают каждое
+выражение во все активные сборщики текущего контекста: сборщик запроса,
+который ставит QueryStatsMiddleware, и вложенные query_budget. Итог
+отдаётся в заголовке Server-Timing; медленные запросы и повторы одного
+выражения (похоже на N+1) попадают в лог.
+"""
+import contextvars
+import logging
+import os
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+# Запрос дольше этого порога логируется вместе со статистикой SQL
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Сколько раз одно выражение может выполниться за запрос до предупреждения о N+1
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+_STARTED_KEY = "query_stats_started"
+_WHITESPACE = re.compile(r"\s+")
+
+
+class QueryStats:
+    """Статистика выражений, выполненных за время жизни сборщика"""
+
+    def __init__(self):
+        self.count = 0
+        self.db_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: Optional[str] = None
+        self.statements: Counter = Counter()
+
+    def record(self, statement: str, seconds: float) -> None:
+        self.count += 1
+        self.db_seconds += seconds
+        self.statements[statement] += 1
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: Optional[int] = None) -> List[Tuple[str, int]]:
+        """Выражения, выполненные не меньше threshold (N_PLUS_ONE_THRESHOLD) раз"""
+        threshold = N_PLUS_ONE_THRESHOLD if threshold is None else threshold
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+    def server_timing(self, total_seconds: Optional[float] = None) -> str:
+        parts = [f'db;dur={self.db_seconds * 1000:.1f};desc="{self.count} queries"']
+        if total_seconds is not None:
+            parts.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_collectors: contextvars.ContextVar[Tuple[QueryStats, ...]] = contextvars.ContextVar(
+    "query_stats_collectors", default=()
+)
+
+
+@contextmanager
+def collect_queries() -> Iterator[QueryStats]:
+    """Сборщик выражений, выполненных внутри блока (в том же контексте)"""
+    stats = QueryStats()
+    token = _collectors.set(_collectors.get() + (stats,))
+    try:
+        yield stats
+    finally:
+        _collectors.reset(token)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Падает, если внутри блока выполнено больше max_queries выражений.
+    Для тестов и бенчмарков: with query_budget(3): await client.get(...)"""
+    with collect_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        executed = "\n".join(f"  {count} x {statement}" for statement, count in stats.statements.most_common())
+        raise QueryBudgetExceeded(
+            f"Выполнено {stats.count} SQL-выражений при бюджете {max_queries}:\n{executed}"
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _collectors.get():
+        conn.info.setdefault(_STARTED_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    collectors = _collectors.get()
+    started = conn.info.get(_STARTED_KEY)
+    if not collectors or not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    statement = _WHITESPACE.sub(" ", statement).strip()
+    for stats in collectors:
+        stats.record(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # Выражение упало: снимаем отметку начала, чтобы не сбить следующие замеры
+    if not _collectors.get() or exception_context.connection is None:
+        return
+    started = exception_context.connection.info.get(_STARTED_KEY)
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+class QueryStatsMiddleware:
+    """ASGI middleware: статистика SQL на каждый HTTP-запрос, заголовок
+    Server-Timing и лог медленных запросов и повторяющихся выражений"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        with collect_queries() as stats:
+
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    timing = stats.server_timing(time.perf_counter() - started).encode()
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", timing)]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                self._report(scope, stats, time.perf_counter() - started)
+
+    @staticmethod
+    def _report(scope, stats: QueryStats, elapsed: float) -> None:
+        route = f"{scope['method']} {scope['path']}"
+        if elapsed * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "Slow request %s: %.1f ms, %d queries, %.1f ms in DB, slowest %.1f ms: %s",
+                route, elapsed * 1000, stats.count, stats.db_seconds * 1000,
+                stats.slowest_seconds * 1000, stats.slowest_statement,
+            )
+        for statement, count in stats.repeated():
+            logger.warning("Possible N+1 in %s: %d x %s", route, count, statement)
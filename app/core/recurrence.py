@@ -0,0 +1,37 @@
+import os
+from datetime import datetime
+from itertools import islice
+from typing import List
+
+from dateutil.rrule import rrulestr
+from fastapi import HTTPException, status
+
+# Наибольшее число занятий в одной серии
+SERIES_MAX_OCCURRENCES = int(os.getenv("SERIES_MAX_OCCURRENCES", "500"))
+
+
+def expand_rrule(rule: str, start: datetime, limit: int = SERIES_MAX_OCCURRENCES) -> List[datetime]:
+    """Даты занятий по правилу RRULE (RFC 5545), например
+    "FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20". Первое занятие - start, если оно
+    подходит под правило. Правило должно давать не больше limit дат"""
+    rule = rule.strip()
+    if rule.upper().startswith("RRULE:"):
+        rule = rule[len("RRULE:"):]
+    try:
+        occurrences = list(islice(rrulestr(rule, dtstart=start), limit + 1))
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректное правило повторения"
+        )
+    if not occurrences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Правило повторения не даёт ни одного занятия"
+        )
+    if len(occurrences) > limit:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Слишком много занятий в серии: не больше {limit}, задайте COUNT или UNTIL"
+        )
+    return occurrences
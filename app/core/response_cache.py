@@ -0,0 +1,193 @@
+import logging
+import os
+from typing import Awaitable, Callable, Dict, Optional, Type
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.cache import TTLCache
+from app.core.etag import body_etag, etag_matches, not_modified, set_etag
+from app.core.serialization import ResponseShape, dump_json
+
+logger = logging.getLogger(__name__)
+
+# Время жизни закешированного ответа: ограничивает устаревание при записи в обход
+# контроллеров (админка) и при работе нескольких процессов без общего уровня
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+RESPONSE_CACHE_MAXSIZE = int(os.getenv("RESPONSE_CACHE_MAXSIZE", "1024"))
+# Общий для процессов уровень: "" - нет, "memory" - локальная замена, "redis" - Redis
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "")
+RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+
+# Теги инвалидации: ответ кешируется под текущим поколением своего тега,
+# запись увеличивает поколение, и старые ключи больше не читаются
+WORKOUTS = "workouts"
+COURSES = "courses"
+COACHES = "coaches"
+
+
+def coach_tag(coach_id: int) -> str:
+    return f"coach:{coach_id}"
+
+
+class SharedCache:
+    """Общий для процессов уровень кеша"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    async def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemorySharedCache(SharedCache):
+    """Локальная замена общего кеша с той же семантикой (байты, TTL, счётчики).
+    Видна только текущему процессу: для разработки и тестов"""
+
+    def __init__(self, maxsize: int = 10000):
+        self._values = TTLCache(maxsize=maxsize, ttl=float("inf"))
+        self._counters: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if key in self._counters:
+            return str(self._counters[key]).encode()
+        return self._values.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._values.set(key, value, ttl)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+
+class RedisSharedCache(SharedCache):
+    def __init__(self, url: str):
+        # redis - необязательная зависимость, нужна только для этого уровня
+        import redis.asyncio as redis
+        self.client = redis.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        await self.client.set(key, value, px=int(ttl * 1000))
+
+    async def incr(self, key: str) -> int:
+        return await self.client.incr(key)
+
+
+def create_shared_cache(backend: str) -> Optional[SharedCache]:
+    if backend == "memory":
+        return MemorySharedCache()
+    if backend == "redis":
+        return RedisSharedCache(RESPONSE_CACHE_REDIS_URL)
+    return None
+
+
+class ResponseCache:
+    """Read-through кеш готовых JSON-ответов публичных эндпоинтов.
+    Первый уровень - LRU в памяти процесса, второй - необязательный общий"""
+
+    def __init__(self, maxsize: int, ttl: float, shared: Optional[SharedCache] = None):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._generations: Dict[str, int] = {}
+
+    async def _generation(self, tag: str) -> Optional[int]:
+        """Текущее поколение тега; None, если общий уровень недоступен"""
+        if self.shared is None:
+            return self._generations.get(tag, 0)
+        try:
+            value = await self.shared.get(f"gen:{tag}")
+        except Exception:
+            logger.warning("Shared response cache is unavailable", exc_info=True)
+            return None
+        return int(value or 0)
+
+    @staticmethod
+    def _key(request: Request, tag: str, generation: int) -> str:
+        params = urlencode(sorted(request.query_params.multi_items()))
+        return f"resp:{tag}:{generation}:{request.url.path}?{params}"
+
+    async def _shared_get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self.shared.get(key)
+        except Exception:
+            logger.warning("Shared response cache is unavailable", exc_info=True)
+            return None
+
+    async def _shared_set(self, key: str, body: bytes) -> None:
+        try:
+            await self.shared.set(key, body, self.ttl)
+        except Exception:
+            logger.warning("Shared response cache is unavailable", exc_info=True)
+
+    async def respond(
+        self,
+        request: Request,
+        tag: str,
+        schema: Type[BaseModel],
+        loader: Callable[[], Awaitable],
+        shape: Optional[ResponseShape] = None,
+    ) -> Response:
+        """Ответ из кеша или результат loader, сериализованный по schema.
+        Поколение читается до обращения к базе: если запись случится во
+        время загрузки, результат ляжет под старый ключ и не будет прочитан.
+        При совпадении If-None-Match возвращается 304 без тела"""
+        generation = await self._generation(tag)
+        key = None if generation is None else self._key(request, tag, generation)
+
+        status = "HIT"
+        # В памяти процесса хранится (etag, тело), в общем уровне - только тело
+        entry = self.local.get(key) if key else None
+        if entry is None and key and self.shared is not None:
+            body = await self._shared_get(key)
+            if body is not None:
+                entry = (body_etag(body), body)
+                self.local.set(key, entry)
+        if entry is None:
+            status = "MISS"
+            body = dump_json(schema, await loader(), shape)
+            entry = (body_etag(body), body)
+            if key:
+                self.local.set(key, entry)
+                if self.shared is not None:
+                    await self._shared_set(key, body)
+
+        etag, body = entry
+        if etag_matches(request, etag):
+            response = not_modified(etag)
+        else:
+            response = Response(content=body, media_type="application/json")
+            set_etag(response, etag)
+        response.headers["X-Cache"] = status
+        return response
+
+    async def invalidate(self, *tags: str) -> None:
+        """Сброс ответов с указанными тегами. Вызывать после commit"""
+        for tag in set(tags):
+            if self.shared is None:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                continue
+            try:
+                await self.shared.incr(f"gen:{tag}")
+            except Exception:
+                logger.warning("Failed to invalidate shared response cache tag %s", tag, exc_info=True)
+            # Локальные записи старого поколения вытеснятся по LRU или TTL
+
+    def clear(self) -> None:
+        self.local.clear()
+        self._generations.clear()
+
+
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_MAXSIZE,
+    ttl=RESPONSE_CACHE_TTL_SECONDS,
+    shared=create_shared_cache(RESPONSE_CACHE_BACKEND),
+)
@@ -0,0 +1,49 @@
+import re
+from typing import Optional
+
+from sqlalchemy import cast, func, literal, or_
+from sqlalchemy.dialects.postgresql import REGCONFIG
+
+# Конфигурация полнотекстового поиска (русская морфология)
+SEARCH_CONFIG = "russian"
+MIN_SEARCH_LENGTH = 2
+SUGGEST_LIMIT = 10
+
+
+def search_config():
+    return cast(literal(SEARCH_CONFIG), REGCONFIG)
+
+
+def tsvector_expression(*weighted_columns: tuple) -> str:
+    """SQL-выражение для генерируемой колонки tsvector.
+    Принимает пары (имя колонки, вес A-D)"""
+    parts = [
+        f"setweight(to_tsvector('{SEARCH_CONFIG}'::regconfig, coalesce({column}, '')), '{weight}')"
+        for column, weight in weighted_columns
+    ]
+    return " || ".join(parts)
+
+
+def websearch_query(term: str):
+    """Запрос в синтаксисе веб-поиска: слова, "фразы", -исключения"""
+    return func.websearch_to_tsquery(search_config(), term)
+
+
+def prefix_query(term: str) -> Optional[object]:
+    """Префиксный запрос для автодополнения: каждое слово трактуется как начало слова"""
+    tokens = re.findall(r"\w+", term)
+    if not tokens:
+        return None
+    return func.to_tsquery(search_config(), " & ".join(f"{token}:*" for token in tokens))
+
+
+def text_match(vector_column, title_column, term: str):
+    """Условие поиска и релевантность: полнотекстовое совпадение
+    либо нечёткое (триграммы) совпадение со словом заголовка для опечаток"""
+    query = websearch_query(term)
+    condition = or_(
+        vector_column.op("@@")(query),
+        literal(term).op("<%")(title_column),
+    )
+    rank = func.ts_rank_cd(vector_column, query) + func.word_similarity(term, title_column)
+    return condition, rank
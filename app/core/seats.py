@@ -0,0 +1,331 @@
+import enum
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Select, Table, and_, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+class EnrollmentStatus(enum.Enum):
+    ENROLLED = "enrolled"
+    WAITLISTED = "waitlisted"
+    ALREADY_ENROLLED = "already_enrolled"
+    ALREADY_WAITLISTED = "already_waitlisted"
+    UNENROLLED = "unenrolled"
+    LEFT_WAITLIST = "left_waitlist"
+    NOT_ENROLLED = "not_enrolled"
+    NOT_FOUND = "not_found"
+
+
+class SeatAllocator:
+    """Атомарное распределение мест с листом ожидания (FIFO).
+
+    Счётчик enrolled_count в строке сущности (тренировки или курса) меняется
+    одним UPDATE с условием на capacity, поэтому параллельные записи не могут
+    превысить вместимость. Медленные пути (лист ожидания, отписка) берут
+    блокировку строки сущности. Методы не фиксируют транзакцию: это делает
+    вызывающий код.
+    """
+
+    def __init__(self, entities: Table, enrollments: Table, waitlist: Table, key: str):
+        self.entities = entities
+        self.enrollments = enrollments
+        self.waitlist = waitlist
+        self.key = key
+
+    def _has_seat(self):
+        capacity = self.entities.c.capacity
+        return or_(capacity.is_(None), self.entities.c.enrolled_count < capacity)
+
+    async def _claim_seat(self, session: AsyncSession, entity_id: int) -> bool:
+        result = await session.execute(
+            update(self.entities)
+            .where(self.entities.c.id == entity_id, self._has_seat())
+            .values(enrolled_count=self.entities.c.enrolled_count + 1)
+            .returning(self.entities.c.id)
+        )
+        return result.first() is not None
+
+    async def _lock_entity(self, session: AsyncSession, entity_id: int) -> bool:
+        result = await session.execute(
+            select(self.entities.c.id)
+            .where(self.entities.c.id == entity_id)
+            .with_for_update()
+        )
+        return result.first() is not None
+
+    async def _insert_enrollment(self, session: AsyncSession, entity_id: int, user_id: int) -> bool:
+        result = await session.execute(
+            pg_insert(self.enrollments)
+            .values({self.key: entity_id, "user_id": user_id})
+            .on_conflict_do_nothing()
+            .returning(self.enrollments.c.user_id)
+        )
+        return result.first() is not None
+
+    async def _is_enrolled(self, session: AsyncSession, entity_id: int, user_id: int) -> bool:
+        result = await session.execute(
+            select(literal(1)).where(
+                self.enrollments.c[self.key] == entity_id,
+                self.enrollments.c.user_id == user_id
+            )
+        )
+        return result.first() is not None
+
+    async def _leave_waitlist(self, session: AsyncSession, entity_ids: List[int], user_id: int) -> None:
+        # Пользователь получил место напрямую (например, после увеличения
+        # вместимости): его строка в очереди больше не нужна
+        await session.execute(
+            delete(self.waitlist)
+            .where(self.waitlist.c[self.key].in_(entity_ids), self.waitlist.c.user_id == user_id)
+        )
+
+    async def waitlist_position(self, session: AsyncSession, entity_id: int, user_id: int) -> Optional[int]:
+        mine = (
+            select(self.waitlist.c.id)
+            .where(self.waitlist.c[self.key] == entity_id, self.waitlist.c.user_id == user_id)
+            .scalar_subquery()
+        )
+        position = await session.scalar(
+            select(func.count())
+            .select_from(self.waitlist)
+            .where(self.waitlist.c[self.key] == entity_id, self.waitlist.c.id <= mine)
+        )
+        return position or None
+
+    async def enroll(self, session: AsyncSession, entity_id: int, user_id: int) -> Tuple[EnrollmentStatus, Optional[int]]:
+        """Запись пользователя. Возвращает статус и позицию в листе ожидания"""
+        claimed = await self._claim_seat(session, entity_id)
+        if not claimed:
+            # Мест нет (или сущности нет): под блокировкой строки повторяем попытку,
+            # т.к. место могло освободиться, и только потом ставим в очередь
+            if not await self._lock_entity(session, entity_id):
+                return EnrollmentStatus.NOT_FOUND, None
+            if await self._is_enrolled(session, entity_id, user_id):
+                return EnrollmentStatus.ALREADY_ENROLLED, None
+            claimed = await self._claim_seat(session, entity_id)
+
+        if claimed:
+            if not await self._insert_enrollment(session, entity_id, user_id):
+                # Уже записан: место возвращаем
+                await session.execute(
+                    update(self.entities)
+                    .where(self.entities.c.id == entity_id)
+                    .values(enrolled_count=self.entities.c.enrolled_count - 1)
+                )
+                return EnrollmentStatus.ALREADY_ENROLLED, None
+            await self._leave_waitlist(session, [entity_id], user_id)
+            return EnrollmentStatus.ENROLLED, None
+
+        result = await session.execute(
+            pg_insert(self.waitlist)
+            .values({self.key: entity_id, "user_id": user_id})
+            .on_conflict_do_nothing()
+            .returning(self.waitlist.c.id)
+        )
+        status = EnrollmentStatus.WAITLISTED if result.first() else EnrollmentStatus.ALREADY_WAITLISTED
+        return status, await self.waitlist_position(session, entity_id, user_id)
+
+    async def unenroll(self, session: AsyncSession, entity_id: int, user_id: int) -> EnrollmentStatus:
+        """Отписка. Освободившееся место отдаётся первому в листе ожидания"""
+        if not await self._lock_entity(session, entity_id):
+            return EnrollmentStatus.NOT_FOUND
+
+        result = await session.execute(
+            delete(self.enrollments)
+            .where(
+                self.enrollments.c[self.key] == entity_id,
+                self.enrollments.c.user_id == user_id
+            )
+            .returning(self.enrollments.c.user_id)
+        )
+        if result.first() is None:
+            result = await session.execute(
+                delete(self.waitlist)
+                .where(
+                    self.waitlist.c[self.key] == entity_id,
+                    self.waitlist.c.user_id == user_id
+                )
+                .returning(self.waitlist.c.id)
+            )
+            if result.first() is None:
+                return EnrollmentStatus.NOT_ENROLLED
+            return EnrollmentStatus.LEFT_WAITLIST
+
+        await self.promote(session, entity_id)
+        return EnrollmentStatus.UNENROLLED
+
+    async def promote(self, session: AsyncSession, entity_id: int) -> Optional[int]:
+        """Передаёт освободившееся место первому в очереди; если очередь пуста,
+        уменьшает счётчик. Вызывается под блокировкой строки сущности"""
+        head = (
+            select(self.waitlist.c.id)
+            .where(self.waitlist.c[self.key] == entity_id)
+            .order_by(self.waitlist.c.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        while True:
+            result = await session.execute(
+                delete(self.waitlist)
+                .where(self.waitlist.c.id == head)
+                .returning(self.waitlist.c.user_id)
+            )
+            promoted_user_id = result.scalar()
+            if promoted_user_id is None:
+                break
+            if await self._insert_enrollment(session, entity_id, promoted_user_id):
+                return promoted_user_id
+            # Первый в очереди уже записан: его строка ожидания удалена, место
+            # достаётся следующему
+
+        await session.execute(
+            update(self.entities)
+            .where(and_(self.entities.c.id == entity_id, self.entities.c.enrolled_count > 0))
+            .values(enrolled_count=self.entities.c.enrolled_count - 1)
+        )
+        return None
+
+    async def _lock_entities(self, session: AsyncSession, entity_ids: Select, *conditions) -> List[int]:
+        # Блокировки в порядке id: параллельные пакетные записи не взаимоблокируются
+        result = await session.execute(
+            select(self.entities.c.id)
+            .where(self.entities.c.id.in_(entity_ids), *conditions)
+            .order_by(self.entities.c.id)
+            .with_for_update()
+        )
+        return result.scalars().all()
+
+    async def enroll_many(
+        self, session: AsyncSession, entity_ids: Select, user_id: int, values: Optional[dict] = None
+    ) -> Tuple[List[int], List[int]]:
+        """Запись пользователя сразу на многие сущности (entity_ids - запрос их id):
+        один UPDATE занимает места, один INSERT ... SELECT создаёт записи
+        (values - значения остальных колонок записи). Сущности, на которые
+        пользователь уже записан, пропускаются. Возвращает (записан, нет мест);
+        при непустом втором списке записи частичные и транзакцию нужно откатить"""
+        already_enrolled = (
+            select(literal(1))
+            .where(
+                self.enrollments.c[self.key] == self.entities.c.id,
+                self.enrollments.c.user_id == user_id
+            )
+            .exists()
+        )
+        targets = await self._lock_entities(session, entity_ids, ~already_enrolled)
+        if not targets:
+            return [], []
+
+        result = await session.execute(
+            update(self.entities)
+            .where(self.entities.c.id.in_(targets), self._has_seat())
+            .values(enrolled_count=self.entities.c.enrolled_count + 1)
+            .returning(self.entities.c.id)
+        )
+        claimed = set(result.scalars().all())
+        full = [entity_id for entity_id in targets if entity_id not in claimed]
+        if full:
+            return [], full
+
+        values = values or {}
+        result = await session.execute(
+            pg_insert(self.enrollments)
+            .from_select(
+                [self.key, "user_id", *values],
+                select(
+                    self.entities.c.id,
+                    literal(user_id),
+                    *[literal(value, self.enrollments.c[name].type) for name, value in values.items()],
+                ).where(self.entities.c.id.in_(targets))
+            )
+            .on_conflict_do_nothing()
+            .returning(self.enrollments.c[self.key])
+        )
+        enrolled = result.scalars().all()
+        if len(enrolled) < len(targets):
+            # Запись появилась параллельно: лишние места возвращаем
+            await session.execute(
+                update(self.entities)
+                .where(self.entities.c.id.in_(claimed.difference(enrolled)))
+                .values(enrolled_count=self.entities.c.enrolled_count - 1)
+            )
+        if enrolled:
+            await self._leave_waitlist(session, enrolled, user_id)
+        return sorted(enrolled), []
+
+    async def unenroll_many(self, session: AsyncSession, entity_ids: Select, user_id: int, *conditions) -> List[int]:
+        """Отписка сразу от многих сущностей одним DELETE; освободившиеся места
+        отдаются листам ожидания. conditions - дополнительные условия на
+        удаляемые записи. Возвращает id сущностей, где запись была"""
+        locked = await self._lock_entities(session, entity_ids)
+        if not locked:
+            return []
+        result = await session.execute(
+            delete(self.enrollments)
+            .where(
+                self.enrollments.c[self.key].in_(locked),
+                self.enrollments.c.user_id == user_id,
+                *conditions
+            )
+            .returning(self.enrollments.c[self.key])
+        )
+        freed = result.scalars().all()
+        if freed:
+            await self.fill_from_waitlist(session, freed)
+        return sorted(freed)
+
+    async def fill_from_waitlist(self, session: AsyncSession, entity_ids: List[int]) -> None:
+        """Отдаёт свободные места первым в очередях сразу для многих сущностей
+        (после изменения вместимости или пакетной отписки) и пересчитывает
+        счётчики. Свободные места считаются по фактическим записям, поэтому
+        enrolled_count до вызова может быть устаревшим. Строки сущностей
+        должны быть заблокированы вызывающим кодом"""
+        owner = self.waitlist.c[self.key]
+        enrolled = (
+            select(func.count())
+            .select_from(self.enrollments)
+            .where(self.enrollments.c[self.key] == self.entities.c.id)
+            .scalar_subquery()
+        )
+        # Уже записанные из очереди не занимают места при распределении
+        already_enrolled = (
+            select(literal(1))
+            .where(
+                self.enrollments.c[self.key] == owner,
+                self.enrollments.c.user_id == self.waitlist.c.user_id
+            )
+            .exists()
+        )
+        ranked = (
+            select(
+                self.waitlist.c.id,
+                func.row_number().over(partition_by=owner, order_by=self.waitlist.c.id).label("place"),
+                self.entities.c.capacity,
+                enrolled.label("enrolled"),
+            )
+            .join(self.entities, self.entities.c.id == owner)
+            .where(owner.in_(entity_ids), ~already_enrolled)
+            .subquery()
+        )
+        promoted = (
+            delete(self.waitlist)
+            .where(self.waitlist.c.id.in_(
+                select(ranked.c.id).where(or_(
+                    ranked.c.capacity.is_(None),
+                    ranked.c.place <= ranked.c.capacity - ranked.c.enrolled,
+                ))
+            ))
+            .returning(owner, self.waitlist.c.user_id)
+            .cte("promoted")
+        )
+        await session.execute(
+            pg_insert(self.enrollments)
+            .from_select([self.key, "user_id"], select(promoted.c[self.key], promoted.c.user_id))
+            .on_conflict_do_nothing()
+            .add_cte(promoted)
+        )
+        await session.execute(
+            update(self.entities)
+            .where(self.entities.c.id.in_(entity_ids))
+            .values(enrolled_count=enrolled)
+        )
@@ -0,0 +1,254 @@
+"""
+Быстрая сериализация списков в JSON.
+
+Обычный путь FastAPI для ответа со списком: валидация ORM-объектов в
+Pydantic-модели (from_attributes), model_dump, повторная валидация по
+response_model и кодирование stdlib json. Здесь каждая строка (ORM-объект
+или Core Row) один раз обходится по плану полей схемы и кодируется orjson.
+Данные не валидируются: источник - строки базы с уже правильными типами.
+Схема в OpenAPI по-прежнему задаётся response_model роута.
+
+Форма ответа настраивается параметрами fields / expand / format
+(ResponseShape): план обхода включает только запрошенные поля и связи,
+а контроллеры по той же форме выбирают колонки и опции загрузки.
+"""
+import typing
+from functools import lru_cache
+from typing import Any, Callable, FrozenSet, Optional, Type
+
+import orjson
+from fastapi import HTTPException, Query, Response, status
+from pydantic import BaseModel
+from pydantic_core import PydanticUndefined
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+_FIELD = 0
+_MODEL = 1
+_LIST = 2
+
+# Связи, которые в нормализованном формате выносятся на верхний уровень ответа
+SIDELOADED_FIELDS = {"coach": "coaches"}
+
+
+def _nested_model(annotation) -> tuple:
+    """Вид поля: простое значение, вложенная модель или список моделей"""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        if len(args) == 1:
+            return _nested_model(args[0])
+        return _FIELD, None
+    if origin in (list, typing.List):
+        (item,) = typing.get_args(annotation) or (Any,)
+        if isinstance(item, type) and issubclass(item, BaseModel):
+            return _LIST, item
+        return _FIELD, None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return _MODEL, annotation
+    return _FIELD, None
+
+
+class ModelSerializer:
+    """План обхода объекта по полям Pydantic-модели.
+
+    fields ограничивает простые поля верхнего уровня, expand - пути
+    вложенных моделей ("workouts", "workouts.coach"); None - без ограничений"""
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        fields: Optional[FrozenSet[str]] = None,
+        expand: Optional[FrozenSet[str]] = None,
+        normalized: bool = False,
+        prefix: str = "",
+    ):
+        self.model = model
+        self.fields = []
+        for name, field in model.model_fields.items():
+            default = None if field.default is PydanticUndefined else field.default
+            kind, nested = _nested_model(field.annotation)
+            child = sideload = None
+            if kind == _FIELD:
+                if fields is not None and name not in fields:
+                    continue
+            else:
+                path = prefix + name
+                if expand is not None and path not in expand:
+                    continue
+                child = serializer_for(nested, None, expand, normalized, path + ".")
+                if normalized and kind == _MODEL:
+                    sideload = SIDELOADED_FIELDS.get(name)
+            self.fields.append((field.alias or name, name, default, kind, child, sideload))
+
+    def __call__(self, obj, sink: Optional[dict] = None) -> dict:
+        out = {}
+        for key, name, default, kind, child, sideload in self.fields:
+            value = getattr(obj, name, default)
+            if value is not None and kind != _FIELD:
+                if kind == _LIST:
+                    value = [child(item, sink) for item in value]
+                elif sideload:
+                    # Вместо вложенного объекта - одна копия на верхнем уровне
+                    bucket = sink.setdefault(sideload, {})
+                    if value.id not in bucket:
+                        bucket[value.id] = child(value, sink)
+                    continue
+                else:
+                    value = child(value, sink)
+            out[key] = value
+        return out
+
+
+@lru_cache(maxsize=None)
+def serializer_for(
+    model: Type[BaseModel],
+    fields: Optional[FrozenSet[str]] = None,
+    expand: Optional[FrozenSet[str]] = None,
+    normalized: bool = False,
+    prefix: str = "",
+) -> ModelSerializer:
+    return ModelSerializer(model, fields, expand, normalized, prefix)
+
+
+def plain_fields(model: Type[BaseModel]) -> FrozenSet[str]:
+    return frozenset(
+        name for name, field in model.model_fields.items()
+        if _nested_model(field.annotation)[0] == _FIELD
+    )
+
+
+def expand_paths(model: Type[BaseModel], prefix: str = "") -> FrozenSet[str]:
+    """Все пути вложенных моделей схемы"""
+    paths = set()
+    for name, field in model.model_fields.items():
+        kind, nested = _nested_model(field.annotation)
+        if kind != _FIELD:
+            paths.add(prefix + name)
+            paths |= expand_paths(nested, f"{prefix}{name}.")
+    return frozenset(paths)
+
+
+class ResponseShape:
+    """Форма ответа для элементов модели model: набор полей, раскрываемые
+    связи и нормализованный формат (тренеры выносятся в "coaches")"""
+
+    def __init__(
+        self,
+        model: Type[BaseModel],
+        fields: Optional[FrozenSet[str]] = None,
+        expand: Optional[FrozenSet[str]] = None,
+        normalized: bool = False,
+    ):
+        self.model = model
+        self.fields = fields
+        self.expand = expand_paths(model) if expand is None else expand
+        self.normalized = normalized
+
+    def expands(self, path: str) -> bool:
+        return path in self.expand
+
+    def loader(self, relationship) -> Any:
+        """Опция загрузки связи "многие к одному": при нормализованном формате
+        отдельный IN-запрос по уникальным id вместо JOIN на каждую строку"""
+        return selectinload(relationship) if self.normalized else joinedload(relationship)
+
+    def load_only(self, entity, *required: str) -> list:
+        """Опция загрузки только запрошенных колонок (плюс необходимых для связей)"""
+        if self.fields is None:
+            return []
+        return [load_only(*[getattr(entity, name) for name in sorted(self.fields | set(required))])]
+
+    def serializer(self) -> ModelSerializer:
+        return serializer_for(self.model, self.fields, self.expand, self.normalized)
+
+
+def shape_params(model: Type[BaseModel]) -> Callable[..., Optional[ResponseShape]]:
+    """Зависимость FastAPI: разбор fields / expand / format для элементов model.
+    Без параметров возвращает None - полный ответ по схеме роута"""
+    allowed_fields = plain_fields(model)
+    allowed_expand = expand_paths(model)
+
+    def dependency(
+        fields: Optional[str] = Query(
+            None, description=f"Поля через запятую: {', '.join(sorted(allowed_fields))}"
+        ),
+        expand: Optional[str] = Query(
+            None,
+            description="Вложенные объекты через запятую"
+            + (f": {', '.join(sorted(allowed_expand))}" if allowed_expand else "")
+            + ". Пустое значение - без вложенных объектов",
+        ),
+        response_format: str = Query(
+            "nested", alias="format", pattern="^(nested|normalized)$",
+            description="normalized - тренеры один раз в поле coaches вместо вложения",
+        ),
+    ) -> Optional[ResponseShape]:
+        if fields is None and expand is None and response_format == "nested":
+            return None
+        normalized = response_format == "normalized"
+
+        field_set = None
+        if fields is not None:
+            field_set = _split(fields)
+            unknown = field_set - allowed_fields
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Неизвестные поля: {', '.join(sorted(unknown))}"
+                )
+            # Без id и coach_id клиент не сможет связать элементы с тренерами
+            field_set |= {"id"} | ({"coach_id"} & allowed_fields if normalized else set())
+
+        expand_set = None
+        if expand is not None:
+            expand_set = _split(expand)
+            unknown = expand_set - allowed_expand
+            if unknown:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Нельзя раскрыть: {', '.join(sorted(unknown))}"
+                )
+            # "workouts.coach" подразумевает "workouts"
+            expand_set |= {path.rsplit(".", 1)[0] for path in expand_set if "." in path}
+
+        return ResponseShape(model, field_set, expand_set, normalized)
+
+    return dependency
+
+
+def _split(value: str) -> FrozenSet[str]:
+    return frozenset(part.strip() for part in value.split(",") if part.strip())
+
+
+def dump_json(model: Type[BaseModel], obj, shape: Optional[ResponseShape] = None) -> bytes:
+    """JSON объекта в форме схемы model. Если задана shape, элементы
+    shape.model сериализуются по ней, а вынесенные объекты добавляются
+    на верхний уровень"""
+    if shape is None:
+        return orjson.dumps(serializer_for(model)(obj), option=orjson.OPT_NON_STR_KEYS)
+
+    sink: dict = {}
+    item = shape.serializer()
+    if model is shape.model:
+        out = item(obj, sink)
+    else:
+        # Контейнер списка: простые поля как есть, элементы - по форме
+        out = {}
+        for key, name, default, kind, child, _ in serializer_for(model).fields:
+            value = getattr(obj, name, default)
+            if value is not None and kind != _FIELD:
+                serialize = item if child.model is shape.model else child
+                value = [serialize(v, sink) for v in value] if kind == _LIST else serialize(value, sink)
+            out[key] = value
+    for key, bucket in sink.items():
+        out[key] = list(bucket.values())
+    return orjson.dumps(out, option=orjson.OPT_NON_STR_KEYS)
+
+
+def json_response(
+    model: Type[BaseModel],
+    obj,
+    headers: Optional[dict] = None,
+    shape: Optional[ResponseShape] = None,
+) -> Response:
+    return Response(content=dump_json(model, obj, shape), media_type="application/json", headers=headers)
@@ -1,37 +1,486 @@
+import asyncio
+import hashlib
+import hmac
+import logging
 import os
+import re
+import shutil
+import time
 import uuid
-from fastapi import UploadFile
-from datetime import datetime
-from app.core.s3_config import upload_profile_photo
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.exceptions import ClientError
+from fastapi import HTTPException, Request, Response, UploadFile, status
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
+
+from app.core import s3_config
+from app.core.auth import SECRET_KEY
+from app.core.metrics import STORAGE_UPLOAD_BYTES, STORAGE_UPLOAD_DURATION
+
+logger = logging.getLogger(__name__)
+
+# Драйвер хранилища: "s3" или "local" (локальный диск для разработки и тестов)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "media")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/media")
+LOCAL_UPLOAD_URL = os.getenv("LOCAL_UPLOAD_URL", "/storage")
+
+# Ограничения загрузки
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(10 * 1024 * 1024)))
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+# Запас на границы и заголовки частей multipart поверх самого файла
+UPLOAD_FORM_OVERHEAD_BYTES = 64 * 1024
+PRESIGNED_UPLOAD_EXPIRE_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRE_SECONDS", "600"))
+# Одновременных операций с хранилищем на процесс
+STORAGE_CONCURRENCY = int(os.getenv("STORAGE_CONCURRENCY", "4"))
+
+PROFILE_PHOTO_PREFIX = "profile_photos"
+
+# Допустимые форматы: тип определяется по сигнатуре файла, а не по заголовку клиента
+ALLOWED_IMAGE_TYPES = {
+    "image/jpeg": "jpg",
+    "image/png": "png",
+    "image/webp": "webp",
+    "image/heic": "heic",
+}
+
+_storage_executor = ThreadPoolExecutor(max_workers=STORAGE_CONCURRENCY, thread_name_prefix="storage")
+
+
+class StorageBackend:
+    """Хранилище объектов. Блокирующие операции выполняются в отдельном пуле потоков"""
+
+    # Метка драйвера в метриках
+    name = "base"
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def presign_upload(self, key: str, content_type: str, expires_in: int) -> dict:
+        """Параметры прямой загрузки клиентом: url, method, fields, headers"""
+        raise NotImplementedError
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        prefix = self.public_url("")
+        return url[len(prefix):] if url and url.startswith(prefix) else None
+
+    def _save(self, fileobj, key: str, content_type: str) -> None:
+        raise NotImplementedError
+
+    def _stat(self, key: str) -> Optional[int]:
+        raise NotImplementedError
+
+    def _modified(self, key: str) -> Optional[float]:
+        raise NotImplementedError
+
+    def _touch(self, key: str) -> bool:
+        raise NotImplementedError
+
+    def _read_head(self, key: str, size: int) -> bytes:
+        raise NotImplementedError
+
+    def _read(self, key: str) -> bytes:
+        raise NotImplementedError
+
+    def _delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def _list(self, prefix: str) -> List[Tuple[str, float]]:
+        raise NotImplementedError
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_storage_executor, func, *args)
+
+    def _save_measured(self, fileobj, key: str, content_type: str) -> None:
+        position = fileobj.tell()
+        size = fileobj.seek(0, os.SEEK_END) - position
+        fileobj.seek(position)
+        started = time.perf_counter()
+        self._save(fileobj, key, content_type)
+        STORAGE_UPLOAD_DURATION.labels(self.name).observe(time.perf_counter() - started)
+        STORAGE_UPLOAD_BYTES.labels(self.name).inc(size)
+
+    async def save(self, fileobj, key: str, content_type: str) -> None:
+        await self._run(self._save_measured, fileobj, key, content_type)
+
+    async def stat(self, key: str) -> Optional[int]:
+        """Размер объекта или None, если его нет"""
+        return await self._run(self._stat, key)
+
+    async def modified(self, key: str) -> Optional[float]:
+        """Время изменения объекта (секунды epoch) или None, если его нет"""
+        return await self._run(self._modified, key)
+
+    async def touch(self, key: str) -> bool:
+        """Обновляет время изменения объекта. False, если объекта нет"""
+        return await self._run(self._touch, key)
+
+    async def read_head(self, key: str, size: int = 16) -> bytes:
+        return await self._run(self._read_head, key, size)
+
+    async def read(self, key: str) -> bytes:
+        return await self._run(self._read, key)
+
+    async def delete(self, key: str) -> None:
+        await self._run(self._delete, key)
+
+    async def list(self, prefix: str) -> List[Tuple[str, float]]:
+        """Объекты с префиксом: (ключ, время изменения в секундах epoch)"""
+        return await self._run(self._list, prefix)
+
+
+class S3Storage(StorageBackend):
+    name = "s3"
+
+    def __init__(self):
+        self._client = None
+        self.transfer_config = TransferConfig(
+            multipart_threshold=s3_config.S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=s3_config.S3_MULTIPART_CHUNK_BYTES,
+            max_concurrency=s3_config.S3_PART_CONCURRENCY,
+            use_threads=True,
+        )
+
+    @property
+    def client(self):
+        # Клиент создаётся при первом обращении (и под заглушкой moto в тестах)
+        if self._client is None:
+            self._client = boto3.client(
+                's3',
+                aws_access_key_id=s3_config.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=s3_config.AWS_SECRET_ACCESS_KEY,
+                endpoint_url=f"https://{s3_config.S3_ENDPOINT}",
+                region_name=s3_config.S3_REGION
+            )
+        return self._client
+
+    def public_url(self, key: str) -> str:
+        return f"https://{s3_config.S3_ENDPOINT}/{s3_config.S3_BUCKET_NAME}/{key}"
+
+    def presign_upload(self, key: str, content_type: str, expires_in: int) -> dict:
+        # POST-политика, в отличие от presigned PUT, ограничивает размер на стороне хранилища
+        post = self.client.generate_presigned_post(
+            Bucket=s3_config.S3_BUCKET_NAME,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, UPLOAD_MAX_BYTES],
+            ],
+            ExpiresIn=expires_in,
+        )
+        return {"url": post["url"], "method": "POST", "fields": post["fields"], "headers": {}}
+
+    def _save(self, fileobj, key: str, content_type: str) -> None:
+        # upload_fileobj читает файл частями и переходит на multipart для больших файлов
+        fileobj.seek(0)
+        self.client.upload_fileobj(
+            fileobj,
+            s3_config.S3_BUCKET_NAME,
+            key,
+            ExtraArgs={"ContentType": content_type},
+            Config=self.transfer_config,
+        )
+
+    def _head(self, key: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=s3_config.S3_BUCKET_NAME, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    def _stat(self, key: str) -> Optional[int]:
+        response = self._head(key)
+        return response["ContentLength"] if response else None
+
+    def _modified(self, key: str) -> Optional[float]:
+        response = self._head(key)
+        return response["LastModified"].timestamp() if response else None
+
+    def _touch(self, key: str) -> bool:
+        # В S3 время изменения обновляет только перезапись: копируем объект сам в себя
+        response = self._head(key)
+        if response is None:
+            return False
+        try:
+            self.client.copy_object(
+                Bucket=s3_config.S3_BUCKET_NAME,
+                Key=key,
+                CopySource={"Bucket": s3_config.S3_BUCKET_NAME, "Key": key},
+                MetadataDirective="REPLACE",
+                ContentType=response.get("ContentType", "application/octet-stream"),
+                Metadata=response.get("Metadata", {}),
+            )
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def _read_head(self, key: str, size: int) -> bytes:
+        response = self.client.get_object(
+            Bucket=s3_config.S3_BUCKET_NAME, Key=key, Range=f"bytes=0-{size - 1}"
+        )
+        return response["Body"].read()
+
+    def _read(self, key: str) -> bytes:
+        response = self.client.get_object(Bucket=s3_config.S3_BUCKET_NAME, Key=key)
+        return response["Body"].read()
 
-async def upload_profile_photo(file: UploadFile) -> str:
-    """Загрузка фотографии профиля в S3"""
-    try:
-        # Генерируем уникальное имя файла
-        file_extension = os.path.splitext(file.filename)[1]
-        unique_filename = f"profile_photos/{uuid.uuid4()}{file_extension}"
-        
-        # Читаем содержимое файла
-        content = await file.read()
-        
-        # Загружаем файл в S3
-        s3_client.put_object(
-            Bucket=S3_BUCKET,
-            Key=unique_filename,
-            Body=content,
-            ContentType=file.content_type
+    def _delete(self, key: str) -> None:
+        self.client.delete_object(Bucket=s3_config.S3_BUCKET_NAME, Key=key)
+
+    def _list(self, prefix: str) -> List[Tuple[str, float]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+        return [
+            (item["Key"], item["LastModified"].timestamp())
+            for page in paginator.paginate(Bucket=s3_config.S3_BUCKET_NAME, Prefix=prefix)
+            for item in page.get("Contents", [])
+        ]
+
+
+class LocalStorage(StorageBackend):
+    """Файлы на локальном диске. Прямая загрузка идёт через подписанный
+    PUT на LOCAL_UPLOAD_URL, раздача - через LOCAL_STORAGE_URL"""
+
+    name = "local"
+
+    def __init__(self, root: str, base_url: str, upload_url: str):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url.rstrip("/")
+        self.upload_url = upload_url.rstrip("/")
+
+    def path(self, key: str) -> str:
+        # Ключ должен отображаться в путь как есть: "..", пустые сегменты и
+        # обратные слеши отклоняются, а не нормализуются
+        joined = os.path.join(self.root, key.rstrip("/"))
+        path = os.path.abspath(joined)
+        if "\\" in key or path != joined or not path.startswith(self.root + os.sep):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Некорректный ключ файла"
+            )
+        return path
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def sign(self, key: str, content_type: str, expires: int) -> str:
+        message = f"{key}|{content_type}|{expires}".encode()
+        return hmac.new(SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify(self, key: str, content_type: str, expires: int, signature: str) -> bool:
+        return expires >= time.time() and hmac.compare_digest(
+            self.sign(key, content_type, expires), signature
         )
-        
-        # Генерируем URL для доступа к файлу
-        url = f"https://{S3_BUCKET}.s3.{AWS_REGION}.amazonaws.com/{unique_filename}"
-        return url
-        
-    except ClientError as e:
-        print(f"Ошибка при загрузке файла в S3: {str(e)}")
-        return None
-    except Exception as e:
-        print(f"Неожиданная ошибка: {str(e)}")
-        return None
-
-__all__ = ['upload_profile_photo'] 
\ No newline at end of file
+
+    def presign_upload(self, key: str, content_type: str, expires_in: int) -> dict:
+        expires = int(time.time()) + expires_in
+        query = urlencode({"expires": expires, "signature": self.sign(key, content_type, expires)})
+        return {
+            "url": f"{self.upload_url}/{key}?{query}",
+            "method": "PUT",
+            "fields": {},
+            "headers": {"Content-Type": content_type},
+        }
+
+    def _save(self, fileobj, key: str, content_type: str) -> None:
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Пишем во временный файл и переименовываем, чтобы не отдать частичный объект
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        fileobj.seek(0)
+        with open(tmp_path, "wb") as out:
+            shutil.copyfileobj(fileobj, out, UPLOAD_CHUNK_BYTES)
+        os.replace(tmp_path, path)
+
+    def _stat(self, key: str) -> Optional[int]:
+        try:
+            return os.path.getsize(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def _modified(self, key: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path(key))
+        except FileNotFoundError:
+            return None
+
+    def _touch(self, key: str) -> bool:
+        try:
+            os.utime(self.path(key))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def _read_head(self, key: str, size: int) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read(size)
+
+    def _read(self, key: str) -> bytes:
+        with open(self.path(key), "rb") as f:
+            return f.read()
+
+    def _delete(self, key: str) -> None:
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _list(self, prefix: str) -> List[Tuple[str, float]]:
+        objects = []
+        for dirpath, _, filenames in os.walk(self.path(prefix)):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                key = os.path.relpath(path, self.root).replace(os.sep, "/")
+                objects.append((key, os.path.getmtime(path)))
+        return objects
+
+    async def write_stream(self, key: str, chunks: AsyncIterator[bytes], max_bytes: int) -> int:
+        """Запись тела запроса на диск по частям с ограничением размера"""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.part"
+        written = 0
+        started = time.perf_counter()
+        out = await self._run(open, tmp_path, "wb")
+        try:
+            async for chunk in chunks:
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail="Файл слишком большой"
+                    )
+                await self._run(out.write, chunk)
+        except BaseException:
+            out.close()
+            os.remove(tmp_path)
+            raise
+        out.close()
+        os.replace(tmp_path, path)
+        STORAGE_UPLOAD_DURATION.labels(self.name).observe(time.perf_counter() - started)
+        STORAGE_UPLOAD_BYTES.labels(self.name).inc(written)
+        return written
+
+
+_storage: Optional[StorageBackend] = None
+
+
+def get_storage() -> StorageBackend:
+    global _storage
+    if _storage is None:
+        if STORAGE_BACKEND == "local":
+            _storage = LocalStorage(LOCAL_STORAGE_ROOT, LOCAL_STORAGE_URL, LOCAL_UPLOAD_URL)
+        else:
+            _storage = S3Storage()
+    return _storage
+
+
+def detect_image_type(head: bytes) -> Optional[str]:
+    """Определение формата изображения по первым байтам"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return "image/heic"
+    return None
+
+
+def unsupported_image_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        detail="Поддерживаются только изображения JPEG, PNG, WebP и HEIC"
+    )
+
+
+def too_large_error() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"Файл больше {UPLOAD_MAX_BYTES // (1024 * 1024)} МБ"
+    )
+
+
+class LimitedUploadRequest(Request):
+    """Запрос, тело которого читается не дальше лимита загрузки"""
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        received = 0
+        async for chunk in super().stream():
+            received += len(chunk)
+            if received > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES:
+                raise too_large_error()
+            yield chunk
+
+
+class LimitedUploadRoute(APIRoute):
+    """Роут с загрузкой файла: лимит проверяется до разбора формы.
+
+    FastAPI разбирает multipart целиком (во временный файл) до вызова
+    обработчика, поэтому проверка внутри обработчика срабатывает уже после
+    передачи всего тела. Здесь запрос отклоняется по Content-Length, а без
+    него - как только прочитано больше лимита
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            content_length = request.headers.get("content-length")
+            if (content_length and content_length.isdigit()
+                    and int(content_length) > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD_BYTES):
+                raise too_large_error()
+            return await handler(LimitedUploadRequest(request.scope, request.receive))
+
+        return limited_handler
+
+
+async def validate_image_upload(file: UploadFile) -> str:
+    """Проверка размера и формата до чтения всего тела. Возвращает content type"""
+    size = file.size
+    if size is None:
+        # Файл уже лежит в SpooledTemporaryFile: размер узнаём без чтения.
+        # UploadFile.seek в Starlette 0.27 принимает только смещение, поэтому
+        # переходим в конец через сам файл
+        size = await run_in_threadpool(file.file.seek, 0, os.SEEK_END)
+    if size > UPLOAD_MAX_BYTES:
+        raise too_large_error()
+
+    await file.seek(0)
+    content_type = detect_image_type(await file.read(16))
+    await file.seek(0)
+    if content_type not in ALLOWED_IMAGE_TYPES:
+        raise unsupported_image_error()
+    return content_type
+
+
+def new_photo_key(user_id: int, content_type: str) -> str:
+    """Ключ для исходника, загружаемого клиентом напрямую"""
+    return f"{PROFILE_PHOTO_PREFIX}/{user_id}/{uuid.uuid4()}.{ALLOWED_IMAGE_TYPES[content_type]}"
+
+
+# Ровно формат new_photo_key: profile_photos/<user_id>/<uuid4>.<расширение>
+_PHOTO_UPLOAD_KEY = re.compile(
+    rf"{re.escape(PROFILE_PHOTO_PREFIX)}/(?P<user_id>[1-9][0-9]*)/"
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    rf"\.(?:{'|'.join(sorted(set(ALLOWED_IMAGE_TYPES.values())))})"
+)
+
+
+def is_photo_upload_key(key: str, user_id: int) -> bool:
+    """Ключ выдан new_photo_key для этого пользователя"""
+    match = _PHOTO_UPLOAD_KEY.fullmatch(key)
+    return match is not None and int(match.group("user_id")) == user_id
+
+
+__all__ = ['get_storage', 'StorageBackend', 'S3Storage', 'LocalStorage']
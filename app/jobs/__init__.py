@@ -0,0 +1 @@
+# Этот файл нужен для того, чтобы Python распознавал директорию как пакет
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Очистка осиротевших фото профиля в хранилище.
+
+Запуск: python -m app.jobs.cleanup_photos [--grace-hours 24] [--dry-run]
+
+Фото хранятся по хешу содержимого и могут быть общими для нескольких
+пользователей, поэтому при замене фото старый объект сразу не удаляется.
+Задача считает ссылки из User.profile_photo_url и
+User.profile_photo_variants и удаляет объекты без ссылок. Запускать
+периодически (cron, планировщик).
+"""
+import argparse
+import asyncio
+import json
+
+from app.core.database import async_session, engine
+from app.core.photos import ORPHAN_GRACE_SECONDS, cleanup_orphan_photos
+
+
+async def main(grace_seconds: int, dry_run: bool) -> None:
+    try:
+        async with async_session() as session:
+            report = await cleanup_orphan_photos(session, grace_seconds, dry_run)
+        print(json.dumps(report, indent=2))
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grace-hours", type=float, default=ORPHAN_GRACE_SECONDS / 3600)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(int(args.grace_hours * 3600), args.dry_run))
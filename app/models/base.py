@@ -1,3 +1,11 @@
+from sqlalchemy import DDL, event
 from sqlalchemy.ext.declarative import declarative_base
 
-Base = declarative_base() 
\ No newline at end of file
+Base = declarative_base()
+
+# Триграммный поиск (нечёткое совпадение заголовков) требует расширения pg_trgm
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
\ No newline at end of file
@@ -1,21 +1,39 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Float, Table, Index, Computed, DateTime, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
+from app.core.search import tsvector_expression
 from app.models.base import Base
 
 # Таблица связи для курсов и тренировок
 course_workouts = Table(
     "course_workouts",
     Base.metadata,
-    Column("course_id", Integer, ForeignKey("courses.id")),
-    Column("workout_id", Integer, ForeignKey("workouts.id"))
+    Column("course_id", Integer, ForeignKey("courses.id"), primary_key=True),
+    Column("workout_id", Integer, ForeignKey("workouts.id"), primary_key=True),
+    # Курсы тренировки (is_course_part): первичный ключ начинается с course_id
+    Index("ix_course_workouts_workout_id", "workout_id"),
 )
 
 # Таблица связи для курсов и пользователей
 course_enrollments = Table(
     "course_enrollments",
     Base.metadata,
-    Column("course_id", Integer, ForeignKey("courses.id")),
-    Column("user_id", Integer, ForeignKey("users.id"))
+    Column("course_id", Integer, ForeignKey("courses.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    # Курсы пользователя (/my/courses): первичный ключ начинается с course_id
+    Index("ix_course_enrollments_user_id", "user_id"),
+)
+
+# Лист ожидания на курс (очередь FIFO по id)
+course_waitlist = Table(
+    "course_waitlist",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("course_id", Integer, ForeignKey("courses.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("created_at", DateTime, server_default=func.now()),
+    UniqueConstraint("course_id", "user_id"),
+    Index("ix_course_waitlist_course_id_id", "course_id", "id"),
 )
 
 class Course(Base):
@@ -26,8 +44,27 @@ class Course(Base):
     description = Column(Text)
     price = Column(Float, nullable=True)
     coach_id = Column(Integer, ForeignKey("users.id"))
+    # Вместимость (None - без ограничений) и счётчик занятых мест
+    capacity = Column(Integer, nullable=True)
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Версия строки для ETag: обновляется при любом UPDATE, в т.ч. из Core-запросов
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(tsvector_expression(("title", "A"), ("description", "C")), persisted=True)
+    ))
 
     # Отношения
     coach = relationship("User", back_populates="courses")
     workouts = relationship("Workout", secondary=course_workouts, back_populates="courses")
-    enrolled_users = relationship("User", secondary=course_enrollments, back_populates="enrolled_courses") 
\ No newline at end of file
+    enrolled_users = relationship("User", secondary=course_enrollments, back_populates="enrolled_courses")
+
+    __table_args__ = (
+        # Курсы тренера: страница тренера и проверки владельца
+        Index("ix_courses_coach_id", "coach_id"),
+        Index("ix_courses_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_courses_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+    ) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text
+from sqlalchemy import Boolean, Column, Integer, String, Text, JSON, DateTime, func
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 from app.models.workout import workout_enrollments
@@ -17,6 +17,10 @@ class User(Base):
     description = Column(Text, nullable=True)
     experience_years = Column(Integer, nullable=True)
     profile_photo_url = Column(String, nullable=True)
+    # Уменьшенные копии фото: {вариант: {формат: URL}}
+    profile_photo_variants = Column(JSON, nullable=True)
+    # Версия строки для ETag: обновляется при любом UPDATE, в т.ч. из Core-запросов
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
 
     # Отношения
     workouts = relationship("Workout", back_populates="coach")
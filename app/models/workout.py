@@ -1,15 +1,45 @@
-from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Table
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Integer, String, Text, DateTime, ForeignKey, Float, Table, Index, Computed, UniqueConstraint, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import relationship, deferred
+from app.core.search import tsvector_expression
 from app.models.base import Base
 
 # Таблица связи для тренировок и пользователей
 workout_enrollments = Table(
     "workout_enrollments",
     Base.metadata,
-    Column("workout_id", Integer, ForeignKey("workouts.id")),
-    Column("user_id", Integer, ForeignKey("users.id"))
+    Column("workout_id", Integer, ForeignKey("workouts.id"), primary_key=True),
+    Column("user_id", Integer, ForeignKey("users.id"), primary_key=True),
+    # Курс, при записи на который создана запись (None - запись напрямую):
+    # отписка от курса удаляет только такие записи
+    Column("source_course_id", Integer, ForeignKey("courses.id", ondelete="SET NULL"), nullable=True),
+    # Записи пользователя (/my/workouts): первичный ключ начинается с workout_id
+    Index("ix_workout_enrollments_user_id", "user_id"),
+    Index("ix_workout_enrollments_source_course_id", "source_course_id"),
 )
 
+# Лист ожидания на тренировку (очередь FIFO по id)
+workout_waitlist = Table(
+    "workout_waitlist",
+    Base.metadata,
+    Column("id", Integer, primary_key=True),
+    Column("workout_id", Integer, ForeignKey("workouts.id", ondelete="CASCADE"), nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+    Column("created_at", DateTime, server_default=func.now()),
+    UniqueConstraint("workout_id", "user_id"),
+    Index("ix_workout_waitlist_workout_id_id", "workout_id", "id"),
+)
+
+class WorkoutSeries(Base):
+    """Серия повторяющихся тренировок: правило RRULE (RFC 5545) и начало первого занятия"""
+    __tablename__ = "workout_series"
+
+    id = Column(Integer, primary_key=True)
+    coach_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    rrule = Column(String, nullable=False)
+    start = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=False, server_default=func.now())
+
 class Workout(Base):
     __tablename__ = "workouts"
 
@@ -22,6 +52,20 @@ class Workout(Base):
     sport_type = Column(String)
     coach_id = Column(Integer, ForeignKey("users.id"))
     is_course_part = Column(Boolean, default=False)
+    # Серия, из которой создано занятие; правки "это и следующие" идут по (series_id, datetime)
+    series_id = Column(Integer, ForeignKey("workout_series.id", ondelete="SET NULL"), nullable=True)
+    # Вместимость (None - без ограничений) и счётчик занятых мест
+    capacity = Column(Integer, nullable=True)
+    enrolled_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Версия строки для ETag: обновляется при любом UPDATE, в т.ч. из Core-запросов
+    updated_at = Column(DateTime, nullable=False, server_default=func.now(), onupdate=func.now())
+    search_vector = deferred(Column(
+        TSVECTOR,
+        Computed(
+            tsvector_expression(("title", "A"), ("sport_type", "B"), ("description", "C")),
+            persisted=True
+        )
+    ))
 
     # Отношения
     coach = relationship("User", back_populates="workouts")
@@ -30,4 +74,19 @@ class Workout(Base):
         secondary=workout_enrollments,
         back_populates="enrolled_workouts"
     )
-    courses = relationship("Course", secondary="course_workouts", back_populates="workouts") 
\ No newline at end of file
+    courses = relationship("Course", secondary="course_workouts", back_populates="workouts")
+
+    # Индексы под keyset-ленту GET /workouts: фильтр + сортировка по (datetime, id)
+    __table_args__ = (
+        Index("ix_workouts_datetime_id", "datetime", "id"),
+        Index("ix_workouts_sport_type_datetime_id", "sport_type", "datetime", "id"),
+        Index("ix_workouts_coach_id_datetime_id", "coach_id", "datetime", "id"),
+        Index("ix_workouts_price_datetime", "price", "datetime"),
+        Index("ix_workouts_series_id_datetime", "series_id", "datetime"),
+        # Полнотекстовый и триграммный поиск
+        Index("ix_workouts_search_vector", "search_vector", postgresql_using="gin"),
+        Index(
+            "ix_workouts_title_trgm", "title",
+            postgresql_using="gin", postgresql_ops={"title": "gin_trgm_ops"}
+        ),
+    ) 
\ No newline at end of file
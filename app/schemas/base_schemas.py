@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import Optional, Dict
 
 class UserBase(BaseModel):
     email: EmailStr
@@ -14,6 +14,7 @@ class UserResponse(UserBase):
     description: Optional[str] = None
     experience_years: Optional[int] = None
     profile_photo_url: Optional[str] = None
+    profile_photo_variants: Optional[Dict[str, Dict[str, str]]] = None
 
     class Config:
         from_attributes = True 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from app.schemas.base_schemas import UserResponse
 from app.schemas.workout_schemas import WorkoutWithCoach
@@ -7,13 +7,18 @@ class CourseBase(BaseModel):
     title: str
     description: str
     price: Optional[float] = None
+    capacity: Optional[int] = Field(None, ge=1)
 
 class CourseCreate(CourseBase):
     workout_ids: List[int]
 
+class CourseWorkoutIds(BaseModel):
+    workout_ids: List[int] = Field(..., min_length=1)
+
 class CourseResponse(CourseBase):
     id: int
     coach_id: int
+    enrolled_count: int = 0
     workouts: List[WorkoutWithCoach]
 
     class Config:
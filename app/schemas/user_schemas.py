@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime
 from app.schemas.base_schemas import UserBase, UserResponse
 from app.schemas.workout_schemas import WorkoutWithCoach
@@ -28,5 +28,32 @@ class TokenRequest(BaseModel):
     email: EmailStr
     password: str
 
+class CoachStats(BaseModel):
+    coach_id: int
+    workouts_total: int
+    upcoming_workouts: int
+    workout_enrollments: int
+    workout_fill_rate: Optional[float] = None
+    workout_revenue: float
+    courses_total: int
+    course_enrollments: int
+    course_fill_rate: Optional[float] = None
+    course_revenue: float
+    total_revenue: float
+
+class PhotoUploadRequest(BaseModel):
+    content_type: str
+
+class PhotoUploadTicket(BaseModel):
+    key: str
+    url: str
+    method: str
+    fields: Dict[str, str] = {}
+    headers: Dict[str, str] = {}
+    expires_in: int
+
+class PhotoUploadConfirm(BaseModel):
+    key: str
+
 class CoachList(BaseModel):
     coaches: List[UserResponse] 
\ No newline at end of file
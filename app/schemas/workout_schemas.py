@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
 from app.schemas.base_schemas import UserResponse
@@ -10,6 +10,7 @@ class WorkoutBase(BaseModel):
     address: str
     price: Optional[float] = None
     sport_type: str
+    capacity: Optional[int] = Field(None, ge=1)
 
 class WorkoutCreate(WorkoutBase):
     pass
@@ -18,6 +19,8 @@ class WorkoutResponse(WorkoutBase):
     id: int
     coach_id: int
     is_course_part: bool
+    enrolled_count: int = 0
+    series_id: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -33,6 +36,38 @@ class WorkoutList(BaseModel):
 
 class WorkoutListWithCoach(BaseModel):
     workouts: List[WorkoutWithCoach]
+    next_cursor: Optional[str] = None
 
 class WorkoutListWithEnrolledUsers(BaseModel):
-    workouts: List[WorkoutWithCoach] 
\ No newline at end of file
+    workouts: List[WorkoutWithCoach]
+
+class WorkoutSeriesCreate(BaseModel):
+    title: str
+    description: str
+    address: str
+    price: Optional[float] = None
+    sport_type: str
+    capacity: Optional[int] = Field(None, ge=1)
+    start: datetime
+    rrule: str = Field(..., description="Правило повторения RFC 5545, например FREQ=WEEKLY;BYDAY=MO,WE;COUNT=20")
+
+class WorkoutSeriesUpdate(BaseModel):
+    """Изменения для занятия и всех следующих в серии. Не заданные поля не меняются"""
+    title: Optional[str] = None
+    description: Optional[str] = None
+    address: Optional[str] = None
+    price: Optional[float] = None
+    sport_type: Optional[str] = None
+    capacity: Optional[int] = Field(None, ge=1)
+    shift_minutes: Optional[int] = Field(None, description="Сдвиг времени занятий в минутах")
+
+class WorkoutSeriesResponse(BaseModel):
+    id: int
+    coach_id: int
+    rrule: str
+    start: datetime
+    workouts: List[WorkoutResponse]
+
+class WorkoutSeriesCancelled(BaseModel):
+    series_id: int
+    cancelled: int 
\ No newline at end of file
@@ -63,7 +63,7 @@ async def register_coach(
         )
 
     # Создаем нового тренера
-    hashed_password = get_password_hash(password)
+    hashed_password = await get_password_hash(password)
     new_coach = User(
         email=email,
         first_name=first_name,
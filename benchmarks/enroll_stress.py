@@ -0,0 +1,139 @@
+"""
+Стресс-проверка записи на тренировку с ограниченной вместимостью.
+
+Запуск: python -m benchmarks.enroll_stress [--users 300] [--capacity 25]
+
+Создаёт тренера, тренировку и пользователей в базе из DATABASE_URL,
+параллельно вызывает WorkoutController.enroll_to_workout (каждый вызов -
+в своей сессии), затем отписывает часть записанных и проверяет, что
+мест не продано больше вместимости, счётчик совпадает с числом записей,
+а лист ожидания продвигается по порядку. Созданные данные удаляются.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from app.controllers.workout_controller import WorkoutController
+from app.core.database import async_session, check_schema_version, engine
+import app.models.course  # noqa: F401 - регистрирует Course для связей Workout
+from app.models.user import User
+from app.models.workout import Workout, workout_enrollments, workout_waitlist
+
+
+async def seed(users: int, capacity: int):
+    tag = uuid.uuid4().hex[:8]
+    async with async_session() as session:
+        coach = User(email=f"stress-coach-{tag}@example.com", first_name="Stress",
+                     last_name="Coach", hashed_password="-", is_coach=True)
+        session.add(coach)
+        await session.flush()
+        workout = Workout(title=f"Stress {tag}", description="", datetime=datetime.utcnow() + timedelta(days=1),
+                          address="", sport_type="stress", coach_id=coach.id, capacity=capacity)
+        members = [
+            User(email=f"stress-{tag}-{i}@example.com", first_name="Stress", last_name=str(i),
+                 hashed_password="-", is_coach=False)
+            for i in range(users)
+        ]
+        session.add(workout)
+        session.add_all(members)
+        await session.commit()
+        return coach, workout, members
+
+
+async def enroll(workout_id: int, user: User):
+    async with async_session() as session:
+        try:
+            return await WorkoutController(session).enroll_to_workout(workout_id, user)
+        except HTTPException as exc:
+            return exc
+
+
+async def unenroll(workout_id: int, user: User):
+    async with async_session() as session:
+        return await WorkoutController(session).unenroll_from_workout(workout_id, user)
+
+
+async def snapshot(workout_id: int):
+    async with async_session() as session:
+        enrolled_count, capacity = (await session.execute(
+            select(Workout.enrolled_count, Workout.capacity).where(Workout.id == workout_id)
+        )).one()
+        enrolled = set((await session.execute(
+            select(workout_enrollments.c.user_id).where(workout_enrollments.c.workout_id == workout_id)
+        )).scalars())
+        waitlist = list((await session.execute(
+            select(workout_waitlist.c.user_id)
+            .where(workout_waitlist.c.workout_id == workout_id)
+            .order_by(workout_waitlist.c.id)
+        )).scalars())
+        return enrolled_count, capacity, enrolled, waitlist
+
+
+async def cleanup(coach: User, workout: Workout, members):
+    async with async_session() as session:
+        await session.execute(delete(workout_enrollments).where(workout_enrollments.c.workout_id == workout.id))
+        await session.execute(delete(workout_waitlist).where(workout_waitlist.c.workout_id == workout.id))
+        await session.execute(delete(Workout).where(Workout.id == workout.id))
+        await session.execute(delete(User).where(User.id.in_([coach.id] + [m.id for m in members])))
+        await session.commit()
+
+
+async def main(users: int, capacity: int, release: int) -> int:
+    await check_schema_version()
+    coach, workout, members = await seed(users, capacity)
+    failures = []
+    try:
+        started = time.perf_counter()
+        results = await asyncio.gather(*[enroll(workout.id, member) for member in members])
+        elapsed = time.perf_counter() - started
+
+        errors = [r for r in results if isinstance(r, HTTPException)]
+        enrolled_count, _, enrolled, waitlist = await snapshot(workout.id)
+        if len(enrolled) > capacity:
+            failures.append(f"oversold: {len(enrolled)} > {capacity}")
+        if enrolled_count != len(enrolled):
+            failures.append(f"counter {enrolled_count} != rows {len(enrolled)}")
+        if len(enrolled) + len(waitlist) != users - len(errors):
+            failures.append("some users are neither enrolled nor waitlisted")
+
+        # Освобождаем места: их должны занять первые из очереди
+        leaving = [m for m in members if m.id in enrolled][:release]
+        expected_promoted = set(waitlist[:len(leaving)])
+        await asyncio.gather(*[unenroll(workout.id, member) for member in leaving])
+        enrolled_count_after, _, enrolled_after, _ = await snapshot(workout.id)
+        if not expected_promoted <= enrolled_after:
+            failures.append("waitlist was not promoted in FIFO order")
+        if enrolled_count_after != len(enrolled_after) or len(enrolled_after) > capacity:
+            failures.append("counter drifted after unenroll")
+
+        print(json.dumps({
+            "users": users,
+            "capacity": capacity,
+            "elapsed_s": round(elapsed, 3),
+            "enrolled": len(enrolled),
+            "waitlisted": len(waitlist),
+            "errors": len(errors),
+            "released": len(leaving),
+            "enrolled_after_release": len(enrolled_after),
+            "failures": failures,
+        }, indent=2))
+    finally:
+        await cleanup(coach, workout, members)
+        await engine.dispose()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--capacity", type=int, default=25)
+    parser.add_argument("--release", type=int, default=5)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.users, args.capacity, args.release)))
@@ -0,0 +1,325 @@
+"""
+Нагрузочный прогон API в процессе по сценариям трафика.
+
+Запуск: python -m benchmarks.load [--mix mixed] [--concurrency 20] [--duration 30]
+        [--warmup 3] [--seed 42] [--tag bench] [--output results.json]
+
+Сначала заполните базу: python -m benchmarks.seed --tag bench. Виртуальные
+пользователи (--concurrency) ходят в приложение из main.py через
+httpx.AsyncClient(app=...) - без сети и uvicorn, но со всеми middleware,
+кешем ответов и пулом соединений. Каждый пользователь выбирает действие
+по весам сценария; генератор случайных чисел задаётся --seed.
+
+Сценарии (--mix):
+  catalog      - лента тренировок с фильтрами и страницами, курсы, тренеры, подсказки
+  login        - POST /token (bcrypt)
+  enroll_storm - запись и отписка на несколько популярных тренировок одновременно
+  my_polling   - опрос /my/workouts/ и /my/courses/ с If-None-Match
+  mixed        - смесь всех перечисленных
+
+Результат - JSON в stdout (и в --output): общая пропускная способность и
+по каждой операции число запросов, rps, коды ответов и p50/p95/p99 в мс.
+Файлы разных коммитов удобно сравнивать diff'ом или jq.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import random
+import subprocess
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import func, select
+
+import main as application
+from app.core.auth import create_access_token
+from app.core.database import async_session
+from app.models.course import Course
+from app.models.user import User
+from app.models.workout import Workout
+from benchmarks.seed import BENCH_PASSWORD, SPORT_TYPES, coach_email, user_email
+
+# Популярные тренировки, за места на которых соревнуются в enroll_storm
+HOT_WORKOUTS = 5
+
+
+class Recorder:
+    """Длительности и коды ответов по операциям"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Counter] = defaultdict(Counter)
+        self.enabled = False
+
+    def record(self, label: str, seconds: float, status: str) -> None:
+        if self.enabled:
+            self.latencies[label].append(seconds)
+            self.statuses[label][status] += 1
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Процентиль по ближайшему рангу"""
+    rank = math.ceil(q / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+class Dataset:
+    """Идентификаторы засеянных данных, с которыми работают сценарии"""
+
+    def __init__(self, tag: str):
+        self.tag = tag
+        self.coach_ids: List[int] = []
+        self.user_count = 0
+        self.workout_ids: List[int] = []
+        self.hot_workout_ids: List[int] = []
+        self.course_ids: List[int] = []
+
+    async def load(self) -> "Dataset":
+        async with async_session() as session:
+            self.coach_ids = list((await session.execute(
+                select(User.id).where(User.email.like(coach_email(self.tag, "%"))).order_by(User.id)
+            )).scalars())
+            self.user_count = await session.scalar(
+                select(func.count()).select_from(User).where(User.email.like(user_email(self.tag, "%")))
+            )
+            self.workout_ids = list((await session.execute(
+                select(Workout.id)
+                .where(Workout.coach_id.in_(self.coach_ids), Workout.datetime >= datetime.utcnow())
+                .order_by(Workout.id)
+            )).scalars())
+            self.hot_workout_ids = list((await session.execute(
+                select(Workout.id)
+                .where(
+                    Workout.coach_id.in_(self.coach_ids),
+                    Workout.datetime >= datetime.utcnow(),
+                    Workout.capacity.isnot(None),
+                )
+                .order_by(Workout.id)
+                .limit(HOT_WORKOUTS)
+            )).scalars())
+            self.course_ids = list((await session.execute(
+                select(Course.id).where(Course.coach_id.in_(self.coach_ids)).order_by(Course.id)
+            )).scalars())
+        if not self.user_count or not self.workout_ids:
+            raise SystemExit(f"no data for tag {self.tag!r}: run python -m benchmarks.seed --tag {self.tag}")
+        return self
+
+
+class VirtualUser:
+    """Один клиент: свой токен, свои ETag и записи"""
+
+    def __init__(self, index: int, client: httpx.AsyncClient, data: Dataset, recorder: Recorder, seed: int):
+        self.client = client
+        self.data = data
+        self.recorder = recorder
+        self.rng = random.Random(seed * 1000 + index)
+        self.email = user_email(data.tag, index % data.user_count)
+        self.headers = {"Authorization": f"Bearer {create_access_token(data={'sub': self.email})}"}
+        self.etags: Dict[str, str] = {}
+        self.enrolled: set = set()
+
+    async def request(self, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception as exc:
+            self.recorder.record(label, time.perf_counter() - started, type(exc).__name__)
+            return None
+        self.recorder.record(label, time.perf_counter() - started, str(response.status_code))
+        return response
+
+    # Каталог
+
+    async def browse_workouts(self):
+        response = await self.request("GET /workouts/", "GET", "/workouts/", params={"upcoming": "true"})
+        if response is not None and response.status_code == 200 and self.rng.random() < 0.5:
+            cursor = response.json().get("next_cursor")
+            if cursor:
+                await self.request("GET /workouts/ (page 2)", "GET", "/workouts/",
+                                   params={"upcoming": "true", "cursor": cursor})
+
+    async def filter_workouts(self):
+        params = {"upcoming": "true", "sport_type": self.rng.choice(SPORT_TYPES)}
+        if self.rng.random() < 0.3:
+            params["coach_id"] = self.rng.choice(self.data.coach_ids)
+        await self.request("GET /workouts/?filters", "GET", "/workouts/", params=params)
+
+    async def workout_detail(self):
+        workout_id = self.rng.choice(self.data.workout_ids)
+        await self.request("GET /workouts/{id}", "GET", f"/workouts/{workout_id}", headers=self.headers)
+
+    async def list_courses(self):
+        await self.request("GET /courses/", "GET", "/courses/")
+
+    async def course_detail(self):
+        if self.data.course_ids:
+            course_id = self.rng.choice(self.data.course_ids)
+            await self.request("GET /courses/{id}", "GET", f"/courses/{course_id}")
+
+    async def list_coaches(self):
+        await self.request("GET /coaches/", "GET", "/coaches/")
+
+    async def coach_detail(self):
+        coach_id = self.rng.choice(self.data.coach_ids)
+        await self.request("GET /coaches/{id}", "GET", f"/coaches/{coach_id}")
+
+    async def suggest(self):
+        prefix = self.rng.choice(SPORT_TYPES)[:self.rng.randint(3, 5)]
+        await self.request("GET /search/suggest", "GET", "/search/suggest", params={"q": prefix})
+
+    # Вход
+
+    async def login(self):
+        await self.request("POST /token", "POST", "/token",
+                           json={"email": self.email, "password": BENCH_PASSWORD})
+
+    # Запись
+
+    async def enroll_storm(self):
+        if not self.data.hot_workout_ids:
+            return
+        workout_id = self.rng.choice(self.data.hot_workout_ids)
+        if workout_id in self.enrolled:
+            response = await self.request("POST /workouts/{id}/unenroll", "POST",
+                                          f"/workouts/{workout_id}/unenroll", headers=self.headers)
+            if response is not None and response.status_code == 200:
+                self.enrolled.discard(workout_id)
+        else:
+            response = await self.request("POST /workouts/{id}/enroll", "POST",
+                                          f"/workouts/{workout_id}/enroll", headers=self.headers)
+            # 400 - запись осталась от прошлого прогона: в следующий раз отписываемся
+            if response is not None and response.status_code in (200, 400):
+                self.enrolled.add(workout_id)
+
+    # Опрос своих записей
+
+    async def _poll(self, label: str, url: str):
+        headers = dict(self.headers)
+        if url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+        response = await self.request(label, "GET", url, headers=headers)
+        if response is not None and "etag" in response.headers:
+            self.etags[url] = response.headers["etag"]
+
+    async def poll_my_workouts(self):
+        await self._poll("GET /my/workouts/", "/my/workouts/")
+
+    async def poll_my_courses(self):
+        await self._poll("GET /my/courses/", "/my/courses/")
+
+
+CATALOG = {
+    VirtualUser.browse_workouts: 4,
+    VirtualUser.filter_workouts: 2,
+    VirtualUser.workout_detail: 3,
+    VirtualUser.list_courses: 2,
+    VirtualUser.course_detail: 2,
+    VirtualUser.list_coaches: 1,
+    VirtualUser.coach_detail: 1,
+    VirtualUser.suggest: 2,
+}
+MIXES: Dict[str, Dict[Callable, int]] = {
+    "catalog": CATALOG,
+    "login": {VirtualUser.login: 1},
+    "enroll_storm": {VirtualUser.enroll_storm: 1},
+    "my_polling": {VirtualUser.poll_my_workouts: 1, VirtualUser.poll_my_courses: 1},
+    "mixed": {
+        **{action: weight * 3 for action, weight in CATALOG.items()},
+        VirtualUser.login: 1,
+        VirtualUser.enroll_storm: 4,
+        VirtualUser.poll_my_workouts: 6,
+        VirtualUser.poll_my_courses: 4,
+    },
+}
+
+
+async def run_user(user: VirtualUser, mix: Dict[Callable, int], deadline: float) -> None:
+    actions, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        action = user.rng.choices(actions, weights)[0]
+        await action(user)
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    endpoints = {}
+    for label in sorted(recorder.latencies):
+        values = sorted(recorder.latencies[label])
+        endpoints[label] = {
+            "count": len(values),
+            "rps": round(len(values) / elapsed, 1),
+            "statuses": dict(sorted(recorder.statuses[label].items())),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2),
+        }
+    total = sum(item["count"] for item in endpoints.values())
+    return {"requests": total, "throughput_rps": round(total / elapsed, 1), "endpoints": endpoints}
+
+
+def current_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(args) -> None:
+    # Лог медленных запросов под нагрузкой только мешает замеру
+    logging.getLogger("app.core.query_stats").setLevel(logging.ERROR)
+    data = await Dataset(args.tag).load()
+    recorder = Recorder()
+    mix = MIXES[args.mix]
+
+    await application.startup()
+    try:
+        async with httpx.AsyncClient(app=application.app, base_url="http://benchmark", timeout=None) as client:
+            users = [VirtualUser(i, client, data, recorder, args.seed) for i in range(args.concurrency)]
+            if args.warmup:
+                deadline = time.perf_counter() + args.warmup
+                await asyncio.gather(*[run_user(user, mix, deadline) for user in users])
+            recorder.enabled = True
+            started = time.perf_counter()
+            await asyncio.gather(*[run_user(user, mix, started + args.duration) for user in users])
+            elapsed = time.perf_counter() - started
+    finally:
+        await application.shutdown()
+
+    result = {
+        "commit": current_commit(),
+        "mix": args.mix,
+        "concurrency": args.concurrency,
+        "duration_s": round(elapsed, 2),
+        "seed": args.seed,
+        "dataset": {
+            "coaches": len(data.coach_ids),
+            "users": data.user_count,
+            "upcoming_workouts": len(data.workout_ids),
+            "courses": len(data.course_ids),
+        },
+        **summarize(recorder, elapsed),
+    }
+    output = json.dumps(result, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mix", choices=sorted(MIXES), default="mixed")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tag", default="bench")
+    parser.add_argument("--output")
+    asyncio.run(main(parser.parse_args()))
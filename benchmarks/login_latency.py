@@ -0,0 +1,109 @@
+"""
+Задержка посторонних GET-запросов во время всплеска логинов.
+
+Запуск: python -m benchmarks.login_latency [--logins 64] [--pings 200]
+
+Сравнивает синхронный bcrypt в обработчике (как было раньше) и
+хеширование через password_hasher. Результат печатается в JSON.
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.core.hashing import pwd_context, password_hasher
+
+PASSWORD = "benchmark-password"
+PING_INTERVAL_SECONDS = 0.01
+
+
+def build_app(hashed_password: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.post("/login/blocking")
+    async def login_blocking():
+        if not pwd_context.verify(PASSWORD, hashed_password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    @app.post("/login/executor")
+    async def login_executor():
+        if not await password_hasher.verify(PASSWORD, hashed_password):
+            raise HTTPException(status_code=401)
+        return {"ok": True}
+
+    return app
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_mode(client: httpx.AsyncClient, mode: str, logins: int, pings: int) -> dict:
+    statuses = {}
+
+    async def login():
+        response = await client.post(f"/login/{mode}")
+        statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    async def ping_loop():
+        # Задержка считается от запланированного момента отправки, чтобы
+        # учитывать время, пока event loop был занят
+        latencies = []
+        scheduled = time.perf_counter()
+        for _ in range(pings):
+            await asyncio.sleep(max(0, scheduled - time.perf_counter()))
+            await client.get("/ping")
+            latencies.append((time.perf_counter() - scheduled) * 1000)
+            scheduled += PING_INTERVAL_SECONDS
+        return latencies
+
+    started = time.perf_counter()
+    ping_task = asyncio.create_task(ping_loop())
+    await asyncio.sleep(0)
+    login_tasks = [asyncio.create_task(login()) for _ in range(logins)]
+    latencies = await ping_task
+    await asyncio.gather(*login_tasks)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "mode": mode,
+        "logins": logins,
+        "login_statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "ping_p50_ms": round(percentile(latencies, 50), 2),
+        "ping_p95_ms": round(percentile(latencies, 95), 2),
+        "ping_p99_ms": round(percentile(latencies, 99), 2),
+        "ping_max_ms": round(max(latencies), 2),
+    }
+
+
+async def main(logins: int, pings: int) -> None:
+    hashed_password = pwd_context.hash(PASSWORD)
+    app = build_app(hashed_password)
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+        results = [
+            await run_mode(client, "blocking", logins, pings),
+            await run_mode(client, "executor", logins, pings),
+        ]
+    password_hasher.shutdown()
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=64)
+    parser.add_argument("--pings", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.pings))
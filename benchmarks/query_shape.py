@@ -0,0 +1,172 @@
+"""
+Регрессионная проверка формы запросов курсов, профиля тренера и "моих курсов".
+
+Запуск: python -m benchmarks.query_shape [--workouts 2] [--enrollments 5] [--factor 10]
+
+Создаёт в базе из DATABASE_URL тренера с тремя курсами и учеников, затем
+дважды строит одни и те же ответы (контроллер + сериализация по схеме
+роута): на базовых данных и на данных, где тренировок в курсе и записей
+на курсы и тренировки в --factor раз больше. Проверяется, что число
+SQL-выражений не меняется, а число строк растёт не быстрее данных
+(не больше чем в --factor раз). Декартово произведение коллекций
+(тренировки x участники в одном JOIN) дало бы рост в factor^2 раз.
+Созданные данные удаляются.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator
+
+from sqlalchemy import event, insert
+
+from app.controllers.course_controller import CourseController
+from app.controllers.user_controller import UserController
+from app.core.database import async_session, check_schema_version, engine
+from app.core.query_stats import collect_queries, instrument_engine
+from app.core.serialization import dump_json
+from app.models.course import Course, course_enrollments, course_workouts
+from app.models.user import User
+from app.models.workout import Workout, workout_enrollments
+from app.schemas.course_schemas import CourseListWithEnrolledUsers, CourseResponse
+from app.schemas.user_schemas import CoachResponse
+from benchmarks.seed import _insert, coach_email, drop, user_email
+
+COURSES = 3
+
+
+@contextmanager
+def count_rows() -> Iterator[Counter]:
+    """Число строк, полученных из базы, по выражениям"""
+    rows: Counter = Counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # Адаптер asyncpg не заполняет rowcount для SELECT: строки уже выбраны в курсор
+        fetched = getattr(cursor, "_rows", None)
+        if cursor.description is not None and fetched is not None:
+            rows[" ".join(statement.split())] += len(fetched)
+
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        yield rows
+    finally:
+        event.remove(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+async def seed(tag: str, workouts_per_course: int, enrollments: int) -> dict:
+    """Тренер, COURSES курсов по workouts_per_course тренировок и enrollments
+    учеников, записанных на все курсы и все тренировки"""
+    async with async_session() as session:
+        coach_id, = await _insert(session, User.__table__, [{
+            "email": coach_email(tag, 0), "first_name": "Shape", "last_name": "Coach",
+            "hashed_password": "-", "is_coach": True,
+        }])
+        user_ids = await _insert(session, User.__table__, [
+            {"email": user_email(tag, i), "first_name": "Shape", "last_name": str(i),
+             "hashed_password": "-", "is_coach": False}
+            for i in range(enrollments)
+        ])
+        start = datetime.utcnow() + timedelta(days=1)
+        course_ids = await _insert(session, Course.__table__, [
+            {"title": f"Shape {tag} {c}", "description": "", "coach_id": coach_id, "enrolled_count": enrollments}
+            for c in range(COURSES)
+        ])
+        workout_ids = await _insert(session, Workout.__table__, [
+            {"title": f"Shape {tag} {i}", "description": "", "datetime": start + timedelta(hours=i),
+             "address": "", "sport_type": "shape", "coach_id": coach_id, "is_course_part": True,
+             "enrolled_count": enrollments}
+            for i in range(COURSES * workouts_per_course)
+        ])
+        await session.execute(insert(course_workouts), [
+            {"course_id": course_id, "workout_id": workout_ids[c * workouts_per_course + i]}
+            for c, course_id in enumerate(course_ids)
+            for i in range(workouts_per_course)
+        ])
+        await session.execute(insert(course_enrollments), [
+            {"course_id": course_id, "user_id": user_id} for course_id in course_ids for user_id in user_ids
+        ])
+        await session.execute(insert(workout_enrollments), [
+            {"workout_id": workout_id, "user_id": user_id} for workout_id in workout_ids for user_id in user_ids
+        ])
+        await session.commit()
+        return {"coach_id": coach_id, "user_id": user_ids[0], "course_id": course_ids[0]}
+
+
+async def views(ids: dict) -> dict:
+    """Ответы, форму запросов которых проверяем: {имя: (выражений, строк)}"""
+    async def course(session):
+        return dump_json(CourseResponse, await CourseController(session).get_course(ids["course_id"]))
+
+    async def coach(session):
+        return dump_json(CoachResponse, await UserController(session).get_coach_with_workouts(ids["coach_id"]))
+
+    async def my_courses(session, user_id):
+        user = await session.get(User, user_id)
+        await session.commit()
+        controller = CourseController(session)
+        return dump_json(CourseListWithEnrolledUsers, await controller.get_my_courses(user))
+
+    cases = {
+        "course": course,
+        "coach": coach,
+        "my_courses_student": lambda session: my_courses(session, ids["user_id"]),
+        "my_courses_coach": lambda session: my_courses(session, ids["coach_id"]),
+    }
+    measured = {}
+    for name, build in cases.items():
+        async with async_session() as session:
+            with collect_queries() as stats, count_rows() as rows:
+                await build(session)
+        measured[name] = (stats.count, sum(rows.values()))
+    return measured
+
+
+async def measure(tag: str, workouts_per_course: int, enrollments: int) -> dict:
+    await drop(tag)
+    try:
+        return await views(await seed(tag, workouts_per_course, enrollments))
+    finally:
+        await drop(tag)
+
+
+async def main(workouts_per_course: int, enrollments: int, factor: int) -> int:
+    await check_schema_version()
+    instrument_engine(engine)
+    try:
+        base = await measure("shape-base", workouts_per_course, enrollments)
+        scaled = await measure("shape-scaled", workouts_per_course * factor, enrollments * factor)
+    finally:
+        await engine.dispose()
+
+    failures = []
+    for name in base:
+        (base_queries, base_rows), (scaled_queries, scaled_rows) = base[name], scaled[name]
+        if scaled_queries != base_queries:
+            failures.append(f"{name}: {base_queries} -> {scaled_queries} statements")
+        if scaled_rows > base_rows * factor:
+            failures.append(f"{name}: {base_rows} -> {scaled_rows} rows, more than x{factor}")
+
+    print(json.dumps({
+        "factor": factor,
+        "views": {
+            name: {
+                "statements": [base[name][0], scaled[name][0]],
+                "rows": [base[name][1], scaled[name][1]],
+            }
+            for name in base
+        },
+        "failures": failures,
+    }, indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workouts", type=int, default=2, help="тренировок в курсе на базовых данных")
+    parser.add_argument("--enrollments", type=int, default=5, help="учеников на базовых данных")
+    parser.add_argument("--factor", type=int, default=10)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.workouts, args.enrollments, args.factor)))
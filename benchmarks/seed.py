@@ -0,0 +1,225 @@
+"""
+Синтетические данные для нагрузочных тестов.
+
+Запуск: python -m benchmarks.seed [--coaches 50] [--users 2000] [--workouts 5000]
+        [--courses 200] [--enrollments 20000] [--seed 42] [--tag bench] [--drop]
+
+Пишет в базу из DATABASE_URL (нужен Postgres: модели используют tsvector;
+подойдёт локальный экземпляр), мигрированную alembic upgrade head. Данные воспроизводимы: при одном --seed
+получаются те же тренеры, расписание (относительно даты запуска), курсы
+и записи. Все пользователи создаются с паролем BENCH_PASSWORD и email вида
+<tag>-user-<n>@example.com, тренеры - <tag>-coach-<n>@example.com.
+Повторный запуск с тем же --tag
+сначала удаляет прежние данные; --drop только удаляет.
+
+Счётчики enrolled_count заполняются по фактическим записям, вместимость
+не превышается - как после работы через API.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import delete, func, insert, or_, select, update
+
+from app.core.database import async_session, check_schema_version
+from app.core.hashing import pwd_context
+from app.models.course import Course, course_enrollments, course_waitlist, course_workouts
+from app.models.user import User
+from app.models.workout import Workout, workout_enrollments, workout_waitlist
+
+BENCH_PASSWORD = "benchmark-password"
+
+SPORT_TYPES = ("yoga", "running", "boxing", "swimming", "crossfit", "pilates", "tennis", "cycling")
+TITLE_WORDS = ("Утренняя", "Вечерняя", "Интенсивная", "Лёгкая", "Силовая", "Кардио", "Групповая", "Открытая")
+ADDRESSES = ("Москва, ул. Спортивная, 1", "Москва, Лужники", "Санкт-Петербург, Крестовский остров",
+             "Казань, ул. Баумана, 5", "Онлайн")
+CAPACITIES = (None, 8, 12, 20, 30)
+# Расписание: от вчерашнего дня на SCHEDULE_DAYS вперёд, чтобы часть тренировок была в прошлом
+SCHEDULE_DAYS = 60
+
+
+def user_email(tag: str, index: int) -> str:
+    return f"{tag}-user-{index}@example.com"
+
+
+def coach_email(tag: str, index: int) -> str:
+    return f"{tag}-coach-{index}@example.com"
+
+
+async def drop(tag: str) -> None:
+    """Удаляет данные, созданные с этим тегом"""
+    async with async_session() as session:
+        user_ids = select(User.id).where(User.email.like(f"{tag}-%@example.com")).scalar_subquery()
+        workout_ids = select(Workout.id).where(Workout.coach_id.in_(user_ids)).scalar_subquery()
+        course_ids = select(Course.id).where(Course.coach_id.in_(user_ids)).scalar_subquery()
+        for table, column, owner in (
+            (workout_enrollments, "workout_id", workout_ids), (workout_waitlist, "workout_id", workout_ids),
+            (course_enrollments, "course_id", course_ids), (course_waitlist, "course_id", course_ids),
+        ):
+            await session.execute(delete(table).where(or_(table.c[column].in_(owner), table.c.user_id.in_(user_ids))))
+        await session.execute(delete(course_workouts).where(course_workouts.c.course_id.in_(course_ids)))
+        await session.execute(delete(Course).where(Course.coach_id.in_(user_ids)))
+        await session.execute(delete(Workout).where(Workout.coach_id.in_(user_ids)))
+        await session.execute(delete(User).where(User.id.in_(user_ids)))
+        await session.commit()
+
+
+async def _insert(session, table, rows: List[dict]) -> List[int]:
+    if not rows:
+        return []
+    result = await session.execute(insert(table).returning(table.c.id, sort_by_parameter_order=True), rows)
+    return list(result.scalars())
+
+
+async def seed(
+    coaches: int,
+    users: int,
+    workouts: int,
+    courses: int,
+    enrollments: int,
+    seed_value: int = 42,
+    tag: str = "bench",
+) -> Dict[str, int]:
+    rng = random.Random(seed_value)
+    hashed_password = pwd_context.hash(BENCH_PASSWORD)
+    start = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=1)
+
+    async with async_session() as session:
+        coach_ids = await _insert(session, User.__table__, [
+            dict(email=coach_email(tag, i), first_name="Тренер", last_name=f"№{i}", hashed_password=hashed_password,
+                 is_coach=True, description=f"{rng.choice(SPORT_TYPES)}, стаж {rng.randint(1, 20)} лет",
+                 experience_years=rng.randint(1, 20))
+            for i in range(coaches)
+        ])
+        user_ids = await _insert(session, User.__table__, [
+            dict(email=user_email(tag, i), first_name="Участник", last_name=f"№{i}",
+                 hashed_password=hashed_password, is_coach=False)
+            for i in range(users)
+        ])
+
+        workout_rows = []
+        for i in range(workouts):
+            sport_type = rng.choice(SPORT_TYPES)
+            workout_rows.append(dict(
+                title=f"{rng.choice(TITLE_WORDS)} {sport_type} #{i}",
+                description=f"Тренировка по {sport_type}. " * rng.randint(1, 5),
+                datetime=start + timedelta(minutes=30 * rng.randrange(SCHEDULE_DAYS * 48)),
+                address=rng.choice(ADDRESSES),
+                price=rng.choice((None, 500.0, 1000.0, 1500.0, 2500.0)),
+                sport_type=sport_type,
+                coach_id=rng.choice(coach_ids),
+                is_course_part=False,
+                capacity=rng.choice(CAPACITIES),
+            ))
+        workout_ids = await _insert(session, Workout.__table__, workout_rows)
+
+        # Курсы собираются из тренировок своего тренера
+        by_coach: Dict[int, List[int]] = {}
+        for workout_id, row in zip(workout_ids, workout_rows):
+            by_coach.setdefault(row["coach_id"], []).append(workout_id)
+        course_rows, course_links = [], []
+        for i in range(courses):
+            coach_id = rng.choice(coach_ids)
+            pool = by_coach.get(coach_id, [])
+            course_rows.append(dict(
+                title=f"Курс {rng.choice(TITLE_WORDS).lower()} #{i}",
+                description="Программа из нескольких тренировок",
+                price=rng.choice((None, 5000.0, 9000.0)),
+                coach_id=coach_id,
+                capacity=rng.choice(CAPACITIES),
+            ))
+            course_links.append(rng.sample(pool, min(len(pool), rng.randint(3, 8))))
+        course_ids = await _insert(session, Course.__table__, course_rows)
+        linked = [
+            dict(course_id=course_id, workout_id=workout_id)
+            for course_id, members in zip(course_ids, course_links) for workout_id in members
+        ]
+        if linked:
+            await session.execute(insert(course_workouts), linked)
+            await session.execute(
+                update(Workout)
+                .where(Workout.id.in_({row["workout_id"] for row in linked}))
+                .values(is_course_part=True)
+            )
+
+        # Записи без превышения вместимости; курсам - примерно десятая часть
+        capacity = {workout_id: row["capacity"] for workout_id, row in zip(workout_ids, workout_rows)}
+        taken: Dict[int, set] = {}
+        workout_pairs = []
+        for _ in range(enrollments - enrollments // 10):
+            workout_id, user_id = rng.choice(workout_ids), rng.choice(user_ids)
+            seats = taken.setdefault(workout_id, set())
+            if user_id in seats or (capacity[workout_id] is not None and len(seats) >= capacity[workout_id]):
+                continue
+            seats.add(user_id)
+            workout_pairs.append(dict(workout_id=workout_id, user_id=user_id))
+        course_capacity = {course_id: row["capacity"] for course_id, row in zip(course_ids, course_rows)}
+        course_taken: Dict[int, set] = {}
+        course_pairs = []
+        for _ in range(enrollments // 10 if course_ids else 0):
+            course_id, user_id = rng.choice(course_ids), rng.choice(user_ids)
+            seats = course_taken.setdefault(course_id, set())
+            if user_id in seats or (course_capacity[course_id] is not None and len(seats) >= course_capacity[course_id]):
+                continue
+            seats.add(user_id)
+            course_pairs.append(dict(course_id=course_id, user_id=user_id))
+        if workout_pairs:
+            await session.execute(insert(workout_enrollments), workout_pairs)
+        if course_pairs:
+            await session.execute(insert(course_enrollments), course_pairs)
+
+        for model, table, column, ids in (
+            (Workout, workout_enrollments, "workout_id", workout_ids),
+            (Course, course_enrollments, "course_id", course_ids),
+        ):
+            counts = (
+                select(func.count())
+                .select_from(table)
+                .where(table.c[column] == model.id)
+                .scalar_subquery()
+            )
+            await session.execute(update(model).where(model.id.in_(ids)).values(enrolled_count=counts))
+        await session.commit()
+
+    return {
+        "coaches": len(coach_ids),
+        "users": len(user_ids),
+        "workouts": len(workout_ids),
+        "courses": len(course_ids),
+        "course_workouts": len(linked),
+        "workout_enrollments": len(workout_pairs),
+        "course_enrollments": len(course_pairs),
+    }
+
+
+async def main(args) -> None:
+    await check_schema_version()
+    started = time.perf_counter()
+    await drop(args.tag)
+    if args.drop:
+        print(json.dumps({"dropped": args.tag}))
+        return
+    counts = await seed(args.coaches, args.users, args.workouts, args.courses, args.enrollments, args.seed, args.tag)
+    counts["elapsed_s"] = round(time.perf_counter() - started, 2)
+    print(json.dumps(counts, indent=2))
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--coaches", type=int, default=50)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--workouts", type=int, default=5000)
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--enrollments", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--tag", default="bench")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    add_arguments(parser)
+    parser.add_argument("--drop", action="store_true", help="только удалить данные с этим тегом")
+    asyncio.run(main(parser.parse_args()))
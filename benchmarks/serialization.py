@@ -0,0 +1,94 @@
+"""
+Сериализация длинного списка тренировок: стандартный путь FastAPI против
+app.core.serialization.
+
+Запуск: python -m benchmarks.serialization [--workouts 10000] [--repeat 5]
+
+База не нужна: тренировки и тренеры создаются как несохранённые ORM-объекты.
+Стандартный путь повторяет то, что делали роуты: валидация ORM-объектов
+в WorkoutListWithCoach, затем serialize_response по response_model и
+json.dumps из JSONResponse. Быстрый путь - dump_json по той же схеме.
+Перед замером проверяется, что оба пути дают одинаковый JSON.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+import app.models.course  # noqa: F401 - регистрирует Course для связей Workout
+from app.core.serialization import dump_json
+from app.models.user import User
+from app.models.workout import Workout
+from app.schemas.workout_schemas import WorkoutListWithCoach
+
+
+def build_workouts(count: int, coaches: int = 50):
+    coach_objects = [
+        User(id=i + 1, email=f"coach{i}@example.com", first_name="Coach", last_name=str(i),
+             is_coach=True, description="Опытный тренер", experience_years=5,
+             profile_photo_url=f"/media/profile_photos/{i}.jpeg")
+        for i in range(coaches)
+    ]
+    start = datetime(2030, 1, 1, 9, 0)
+    return [
+        Workout(id=i + 1, title=f"Тренировка {i}", description="Описание " * 10,
+                datetime=start + timedelta(hours=i), address="Москва, ул. Спортивная, 1",
+                price=1000.0 + i % 7, sport_type=("yoga", "running", "boxing")[i % 3],
+                coach_id=coach_objects[i % coaches].id, coach=coach_objects[i % coaches],
+                is_course_part=bool(i % 2), capacity=20, enrolled_count=i % 20)
+        for i in range(count)
+    ]
+
+
+async def standard_path(field, workouts) -> bytes:
+    content = WorkoutListWithCoach(workouts=workouts, next_cursor="abc")
+    value = await serialize_response(field=field, response_content=content)
+    return JSONResponse(value).body
+
+
+def fast_path(workouts) -> bytes:
+    return dump_json(WorkoutListWithCoach, WorkoutListWithCoach.model_construct(workouts=workouts, next_cursor="abc"))
+
+
+async def measure(func, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        if asyncio.iscoroutine(result):
+            await result
+        timings.append((time.perf_counter() - started) * 1000)
+    return {"median_ms": round(statistics.median(timings), 2), "min_ms": round(min(timings), 2)}
+
+
+async def main(count: int, repeat: int) -> None:
+    workouts = build_workouts(count)
+    field = create_response_field("response", WorkoutListWithCoach)
+
+    standard = await standard_path(field, workouts)
+    fast = fast_path(workouts)
+    if json.loads(standard) != json.loads(fast):
+        raise SystemExit("fast path output differs from the standard path")
+
+    results = {
+        "workouts": count,
+        "body_bytes": len(fast),
+        "standard": await measure(lambda: standard_path(field, workouts), repeat),
+        "fast": await measure(lambda: fast_path(workouts), repeat),
+    }
+    results["speedup"] = round(results["standard"]["median_ms"] / results["fast"]["median_ms"], 1)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workouts", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.workouts, args.repeat))
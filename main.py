@@ -1,16 +1,24 @@
+import os
 from fastapi import FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
 from sqladmin import Admin
-from app.core.database import engine, Base
-from app.controllers import user_controller, workout_controller, course_controller
+from app.core.database import engine, check_schema_version
+from app.controllers import user_controller, workout_controller, course_controller, search_controller, storage_controller
 from app.controllers.admin import UserAdmin, WorkoutAdmin, CourseAdmin
 from app.schemas.user_schemas import TokenRequest
 from app.core.auth import create_access_token
 from app.models.user import User
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.database import get_db
+from app.core.database import get_db, get_pool_stats
 from fastapi import Depends
 from app.core.auth import verify_password
+from app.core.hashing import password_hasher
+from app.core.photos import shutdown_image_executor
+from app.core.query_stats import QueryStatsMiddleware, instrument_engine
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, mark_process_dead, render_metrics
+from app.core.storage import STORAGE_BACKEND, LOCAL_STORAGE_ROOT, LOCAL_STORAGE_URL
 
 app = FastAPI(title="Sport App API")
 
@@ -29,6 +37,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Статистика SQL на запрос: заголовок Server-Timing и лог медленных запросов
+instrument_engine(engine)
+app.add_middleware(QueryStatsMiddleware)
+# Метрики Prometheus: длительность по маршрутам и запросы в обработке
+app.add_middleware(MetricsMiddleware)
+
 # Подключаем роуты
 app.include_router(user_controller.router)
 app.include_router(user_controller.coach_router)
@@ -36,6 +50,13 @@ app.include_router(workout_controller.router)
 app.include_router(workout_controller.my_router)
 app.include_router(course_controller.router)
 app.include_router(course_controller.my_router)
+app.include_router(search_controller.router)
+
+# Локальное хранилище файлов: приём прямых загрузок и раздача
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_ROOT, exist_ok=True)
+    app.include_router(storage_controller.router)
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_ROOT), name="media")
 
 @app.post("/token")
 async def login_for_access_token(
@@ -46,7 +67,7 @@ async def login_for_access_token(
     from sqlalchemy import select
     result = await db.execute(select(User).where(User.email == token_request.email))
     user = result.scalars().first()
-    if not user or not verify_password(token_request.password, user.hashed_password):
+    if not user or not await verify_password(token_request.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Неверный email или пароль",
@@ -58,9 +79,24 @@ async def login_for_access_token(
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await check_schema_version()
+
+@app.on_event("shutdown")
+async def shutdown():
+    password_hasher.shutdown()
+    shutdown_image_executor()
+    mark_process_dead()
 
 @app.get("/")
 async def root():
     return {"message": "Добро пожаловать в Sport App API!"}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Метрики в формате Prometheus"""
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+@app.get("/health/db")
+async def db_pool_health():
+    """Состояние пула соединений с БД"""
+    return get_pool_stats()
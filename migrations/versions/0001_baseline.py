@@ -0,0 +1,98 @@
+"""Исходная схема: таблицы в том виде, в каком их создавал create_all
+при старте приложения до появления миграций
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=True),
+        sa.Column("first_name", sa.String(), nullable=True),
+        sa.Column("last_name", sa.String(), nullable=True),
+        sa.Column("middle_name", sa.String(), nullable=True),
+        sa.Column("phone_number", sa.String(), nullable=True),
+        sa.Column("hashed_password", sa.String(), nullable=True),
+        sa.Column("is_coach", sa.Boolean(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("experience_years", sa.Integer(), nullable=True),
+        sa.Column("profile_photo_url", sa.String(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "courses",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("coach_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["coach_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_courses_id", "courses", ["id"])
+
+    op.create_table(
+        "workouts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("title", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("datetime", sa.DateTime(), nullable=True),
+        sa.Column("address", sa.String(), nullable=True),
+        sa.Column("price", sa.Float(), nullable=True),
+        sa.Column("sport_type", sa.String(), nullable=True),
+        sa.Column("coach_id", sa.Integer(), nullable=True),
+        sa.Column("is_course_part", sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(["coach_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_workouts_id", "workouts", ["id"])
+
+    op.create_table(
+        "workout_enrollments",
+        sa.Column("workout_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["workout_id"], ["workouts.id"]),
+    )
+    op.create_table(
+        "course_workouts",
+        sa.Column("course_id", sa.Integer(), nullable=True),
+        sa.Column("workout_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["course_id"], ["courses.id"]),
+        sa.ForeignKeyConstraint(["workout_id"], ["workouts.id"]),
+    )
+    op.create_table(
+        "course_enrollments",
+        sa.Column("course_id", sa.Integer(), nullable=True),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["course_id"], ["courses.id"]),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("course_enrollments")
+    op.drop_table("course_workouts")
+    op.drop_table("workout_enrollments")
+    op.drop_index("ix_workouts_id", table_name="workouts")
+    op.drop_table("workouts")
+    op.drop_index("ix_courses_id", table_name="courses")
+    op.drop_table("courses")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
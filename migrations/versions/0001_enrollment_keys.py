@@ -0,0 +1,61 @@
+"""Первичные ключи таблиц записей на тренировки и курсы
+
+Запись и отписка работают одним INSERT ... ON CONFLICT DO NOTHING /
+DELETE и требуют уникальности (тренировка/курс, пользователь). create_all
+существующие таблицы не меняет, поэтому в базе, созданной до появления
+ключей, ON CONFLICT падает с ошибкой "no unique or exclusion constraint".
+
+Ревизия удаляет неполные строки и дубли и добавляет ключи. Без alembic то
+же самое вручную (для course_enrollments - с course_id):
+
+    DELETE FROM workout_enrollments WHERE workout_id IS NULL OR user_id IS NULL;
+    DELETE FROM workout_enrollments a USING workout_enrollments b
+     WHERE a.workout_id = b.workout_id AND a.user_id = b.user_id AND a.ctid > b.ctid;
+    ALTER TABLE workout_enrollments
+        ALTER COLUMN workout_id SET NOT NULL,
+        ALTER COLUMN user_id SET NOT NULL,
+        ADD CONSTRAINT workout_enrollments_pkey PRIMARY KEY (workout_id, user_id);
+
+Ключ уже есть в базах, созданных create_all после его появления в
+моделях: тогда шаг пропускается.
+
+Revision ID: 0001_enrollment_keys
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001_enrollment_keys"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+ENROLLMENT_TABLES = (("workout_enrollments", "workout_id"), ("course_enrollments", "course_id"))
+
+
+def _enrollments_primary_key(table: str, owner: str) -> None:
+    """Удаляет неполные строки и дубли и добавляет первичный ключ (owner, user_id)"""
+    if sa.inspect(op.get_bind()).get_pk_constraint(table).get("constrained_columns"):
+        return
+    op.execute(f"DELETE FROM {table} WHERE {owner} IS NULL OR user_id IS NULL")
+    op.execute(
+        f"DELETE FROM {table} a USING {table} b "
+        f"WHERE a.{owner} = b.{owner} AND a.user_id = b.user_id AND a.ctid > b.ctid"
+    )
+    op.alter_column(table, owner, existing_type=sa.Integer(), nullable=False)
+    op.alter_column(table, "user_id", existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key(f"{table}_pkey", table, [owner, "user_id"])
+
+
+def upgrade() -> None:
+    for table, owner in ENROLLMENT_TABLES:
+        _enrollments_primary_key(table, owner)
+
+
+def downgrade() -> None:
+    for table, owner in reversed(ENROLLMENT_TABLES):
+        op.drop_constraint(f"{table}_pkey", table, type_="primary")
+        op.alter_column(table, "user_id", existing_type=sa.Integer(), nullable=True)
+        op.alter_column(table, owner, existing_type=sa.Integer(), nullable=True)
@@ -0,0 +1,146 @@
+"""Схема текущих моделей и индексы под запросы контроллеров
+
+Доводит до текущих моделей базу после 0001_enrollment_keys, в том числе
+созданную create_all на любой промежуточной версии моделей: каждый шаг
+проверяет, не сделан ли он уже.
+
+- колонки capacity / enrolled_count / updated_at / search_vector у
+  тренировок и курсов, profile_photo_variants / updated_at у пользователей
+- листы ожидания workout_waitlist и course_waitlist
+- enrolled_count пересчитывается по фактическим записям
+- индексы ленты, поиска и связей
+
+Проверки читают схему из базы, поэтому офлайн-режим (--sql) для этой
+ревизии не поддерживается.
+
+Revision ID: 0002_current_schema
+Revises: 0001_enrollment_keys
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+revision = "0002_current_schema"
+down_revision = "0001_enrollment_keys"
+branch_labels = None
+depends_on = None
+
+WORKOUT_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(sport_type, '')), 'B') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'C')"
+)
+COURSE_SEARCH_VECTOR = (
+    "setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'C')"
+)
+
+# (имя, таблица, колонки, параметры create_index)
+INDEXES = [
+    # Keyset-лента GET /workouts: фильтр + сортировка по (datetime, id)
+    ("ix_workouts_datetime_id", "workouts", ["datetime", "id"], {}),
+    ("ix_workouts_sport_type_datetime_id", "workouts", ["sport_type", "datetime", "id"], {}),
+    ("ix_workouts_coach_id_datetime_id", "workouts", ["coach_id", "datetime", "id"], {}),
+    ("ix_workouts_price_datetime", "workouts", ["price", "datetime"], {}),
+    # Поиск
+    ("ix_workouts_search_vector", "workouts", ["search_vector"], {"postgresql_using": "gin"}),
+    ("ix_workouts_title_trgm", "workouts", ["title"],
+     {"postgresql_using": "gin", "postgresql_ops": {"title": "gin_trgm_ops"}}),
+    ("ix_courses_search_vector", "courses", ["search_vector"], {"postgresql_using": "gin"}),
+    ("ix_courses_title_trgm", "courses", ["title"],
+     {"postgresql_using": "gin", "postgresql_ops": {"title": "gin_trgm_ops"}}),
+    # Курсы тренера
+    ("ix_courses_coach_id", "courses", ["coach_id"], {}),
+    # Связи: первичные ключи записей начинаются с тренировки/курса, поиск по пользователю - отдельно
+    ("ix_workout_enrollments_user_id", "workout_enrollments", ["user_id"], {}),
+    ("ix_course_enrollments_user_id", "course_enrollments", ["user_id"], {}),
+    ("ix_course_workouts_course_id", "course_workouts", ["course_id"], {}),
+    ("ix_course_workouts_workout_id", "course_workouts", ["workout_id"], {}),
+    # Очереди ожидания FIFO
+    ("ix_workout_waitlist_workout_id_id", "workout_waitlist", ["workout_id", "id"], {}),
+    ("ix_course_waitlist_course_id_id", "course_waitlist", ["course_id", "id"], {}),
+]
+
+
+def _inspector():
+    return sa.inspect(op.get_bind())
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in _inspector().get_columns(table)}
+
+
+def _add_column(table: str, column: sa.Column) -> None:
+    if not _has_column(table, column.name):
+        op.add_column(table, column)
+
+
+def _create_waitlist(table: str, owner: str, owner_table: str) -> None:
+    if _inspector().has_table(table):
+        return
+    op.create_table(
+        table,
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(owner, sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=True),
+        sa.ForeignKeyConstraint([owner], [f"{owner_table}.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(owner, "user_id"),
+    )
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    for table in ("workouts", "courses"):
+        _add_column(table, sa.Column("capacity", sa.Integer(), nullable=True))
+        _add_column(table, sa.Column("enrolled_count", sa.Integer(), server_default="0", nullable=False))
+    for table in ("workouts", "courses", "users"):
+        _add_column(table, sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now(), nullable=False))
+    _add_column("users", sa.Column("profile_photo_variants", sa.JSON(), nullable=True))
+    _add_column("workouts", sa.Column(
+        "search_vector", postgresql.TSVECTOR(), sa.Computed(WORKOUT_SEARCH_VECTOR, persisted=True)
+    ))
+    _add_column("courses", sa.Column(
+        "search_vector", postgresql.TSVECTOR(), sa.Computed(COURSE_SEARCH_VECTOR, persisted=True)
+    ))
+
+    _create_waitlist("workout_waitlist", "workout_id", "workouts")
+    _create_waitlist("course_waitlist", "course_id", "courses")
+
+    # Счётчики мест по фактическим записям
+    op.execute(
+        "UPDATE workouts SET enrolled_count = "
+        "(SELECT count(*) FROM workout_enrollments e WHERE e.workout_id = workouts.id)"
+    )
+    op.execute(
+        "UPDATE courses SET enrolled_count = "
+        "(SELECT count(*) FROM course_enrollments e WHERE e.course_id = courses.id)"
+    )
+
+    for table in {table for _, table, _, _ in INDEXES}:
+        existing = {index["name"] for index in _inspector().get_indexes(table)}
+        for name, index_table, columns, options in INDEXES:
+            if index_table == table and name not in existing:
+                op.create_index(name, table, columns, **options)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+
+    op.drop_table("course_waitlist")
+    op.drop_table("workout_waitlist")
+
+    op.drop_column("courses", "search_vector")
+    op.drop_column("workouts", "search_vector")
+    op.drop_column("users", "profile_photo_variants")
+    for table in ("users", "courses", "workouts"):
+        op.drop_column(table, "updated_at")
+    for table in ("courses", "workouts"):
+        op.drop_column(table, "enrolled_count")
+        op.drop_column(table, "capacity")
@@ -0,0 +1,46 @@
+"""Серии повторяющихся тренировок
+
+- таблица workout_series: правило RRULE и начало первого занятия
+- workouts.series_id и индекс (series_id, datetime) под правки
+  «это и следующие»
+
+Revision ID: 0003_workout_series
+Revises: 0002_current_schema
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003_workout_series"
+down_revision = "0002_current_schema"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "workout_series",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("coach_id", sa.Integer(), nullable=False),
+        sa.Column("rrule", sa.String(), nullable=False),
+        sa.Column("start", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False),
+        sa.ForeignKeyConstraint(["coach_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_workout_series_coach_id", "workout_series", ["coach_id"])
+
+    op.add_column("workouts", sa.Column("series_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "workouts_series_id_fkey", "workouts", "workout_series", ["series_id"], ["id"], ondelete="SET NULL"
+    )
+    op.create_index("ix_workouts_series_id_datetime", "workouts", ["series_id", "datetime"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workouts_series_id_datetime", table_name="workouts")
+    op.drop_constraint("workouts_series_id_fkey", "workouts", type_="foreignkey")
+    op.drop_column("workouts", "series_id")
+    op.drop_index("ix_workout_series_coach_id", table_name="workout_series")
+    op.drop_table("workout_series")
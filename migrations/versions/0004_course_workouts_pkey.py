@@ -0,0 +1,46 @@
+"""Первичный ключ таблицы связи курсов и тренировок
+
+- неполные строки и дубли связей удаляются
+- первичный ключ (course_id, workout_id): пакетное добавление тренировок
+  в курс идёт через INSERT ... ON CONFLICT DO NOTHING
+- индекс ix_course_workouts_course_id покрыт первичным ключом и удаляется
+- is_course_part пересчитывается по фактическим связям
+
+Revision ID: 0004_course_workouts_pkey
+Revises: 0003_workout_series
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004_course_workouts_pkey"
+down_revision = "0003_workout_series"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("DELETE FROM course_workouts WHERE course_id IS NULL OR workout_id IS NULL")
+    op.execute(
+        "DELETE FROM course_workouts a USING course_workouts b "
+        "WHERE a.course_id = b.course_id AND a.workout_id = b.workout_id AND a.ctid > b.ctid"
+    )
+    op.alter_column("course_workouts", "course_id", existing_type=sa.Integer(), nullable=False)
+    op.alter_column("course_workouts", "workout_id", existing_type=sa.Integer(), nullable=False)
+    op.create_primary_key("course_workouts_pkey", "course_workouts", ["course_id", "workout_id"])
+    op.drop_index("ix_course_workouts_course_id", table_name="course_workouts")
+
+    op.execute(
+        "UPDATE workouts SET is_course_part = "
+        "EXISTS (SELECT 1 FROM course_workouts cw WHERE cw.workout_id = workouts.id) "
+        "WHERE is_course_part IS DISTINCT FROM "
+        "EXISTS (SELECT 1 FROM course_workouts cw WHERE cw.workout_id = workouts.id)"
+    )
+
+
+def downgrade() -> None:
+    op.create_index("ix_course_workouts_course_id", "course_workouts", ["course_id"])
+    op.drop_constraint("course_workouts_pkey", "course_workouts", type_="primary")
+    op.alter_column("course_workouts", "workout_id", existing_type=sa.Integer(), nullable=True)
+    op.alter_column("course_workouts", "course_id", existing_type=sa.Integer(), nullable=True)
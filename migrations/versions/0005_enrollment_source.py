@@ -0,0 +1,36 @@
+"""Источник записи на тренировку
+
+- workout_enrollments.source_course_id: курс, при записи на который
+  создана запись (NULL - запись напрямую). Отписка от курса с
+  include_workouts удаляет только такие записи
+- индекс по source_course_id для ON DELETE SET NULL при удалении курса
+
+Существующие записи считаются сделанными напрямую.
+
+Revision ID: 0005_enrollment_source
+Revises: 0004_course_workouts_pkey
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005_enrollment_source"
+down_revision = "0004_course_workouts_pkey"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("workout_enrollments", sa.Column("source_course_id", sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        "workout_enrollments_source_course_id_fkey", "workout_enrollments", "courses",
+        ["source_course_id"], ["id"], ondelete="SET NULL"
+    )
+    op.create_index("ix_workout_enrollments_source_course_id", "workout_enrollments", ["source_course_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_workout_enrollments_source_course_id", table_name="workout_enrollments")
+    op.drop_constraint("workout_enrollments_source_course_id_fkey", "workout_enrollments", type_="foreignkey")
+    op.drop_column("workout_enrollments", "source_course_id")